@@ -0,0 +1,168 @@
+import atexit
+import io
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+
+from instrument import stats
+
+
+class AdbShell:
+    """Sesión persistente de `adb shell`: un único proceso adb para muchos comandos.
+
+    Cada comando se escribe por stdin seguido de un `echo` con un centinela
+    único; la respuesta es todo lo leído por stdout hasta ese centinela, que
+    además trae el código de salida del comando.
+    """
+
+    def __init__(self, adb_path, serial=None):
+        self.adb_path = str(adb_path)
+        self.serial = serial
+        self._proc = None
+        self._stdin = None
+        self._stdout = None
+        self.last_returncode = None
+        self._lock = threading.Lock()
+        self._sentinel = f"__ADB_SHELL_{uuid.uuid4().hex}__"
+
+    def _start(self):
+        cmd = [self.adb_path]
+        if self.serial:
+            cmd += ["-s", self.serial]
+        cmd.append("shell")
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT)
+        # La shell del móvil espera "\n": en modo texto, Windows escribiría "\r\n" y cada
+        # comando llegaría con un "\r" pegado al último argumento
+        self._stdin = io.TextIOWrapper(self._proc.stdin, encoding="utf-8", newline="\n",
+                                       write_through=True)
+        self._stdout = io.TextIOWrapper(self._proc.stdout, encoding="utf-8", errors="replace")
+        stats.adb_process(cmd, 0.0)
+
+    def _alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _write(self, command):
+        if not self._alive():
+            self._start()
+        self._stdin.write(f"{{ {command}\n}} 2>&1; echo {self._sentinel} $?\n")
+        self._stdin.flush()
+
+    def _read_lines(self):
+        """Va devolviendo la salida del último comando hasta el centinela"""
+        while True:
+            line = self._stdout.readline()
+            if not line:
+                raise ConnectionError("La sesión adb shell se cerró inesperadamente")
+            pos = line.find(self._sentinel)
+            if pos == -1:
+                yield line
+                continue
+            # El centinela puede llegar pegado a una salida sin salto de línea final
+            if pos:
+                yield line[:pos]
+            status = line[pos + len(self._sentinel):].strip()
+            self.last_returncode = int(status) if status.lstrip("-").isdigit() else 1
+            return
+
+    def _send(self, command):
+        start = time.perf_counter()
+        self._write(command)
+        output = "".join(self._read_lines()).strip()
+        stats.shell_command(time.perf_counter() - start)
+        return self.last_returncode, output
+
+    @staticmethod
+    def _quote(command):
+        if isinstance(command, str):
+            return command
+        return " ".join(shlex.quote(str(arg)) for arg in command)
+
+    def run(self, command):
+        """Ejecuta un comando (lista de argumentos o cadena) y devuelve (código, salida)"""
+        command = self._quote(command)
+        with self._lock:
+            try:
+                return self._send(command)
+            except (OSError, ConnectionError, ValueError):
+                # Un reintento con una sesión nueva (p. ej. tras reconectar el móvil)
+                self._kill()
+                return self._send(command)
+
+    def stream(self, command):
+        """Ejecuta un comando y va devolviendo su salida línea a línea, sin acumularla.
+
+        El código de salida queda en `last_returncode` al terminar. Mientras se
+        recorre, la sesión está ocupada: no se puede llamar a `run` desde dentro.
+        """
+        command = self._quote(command)
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                self._write(command)
+            except (OSError, ValueError):
+                self._kill()
+                self._write(command)
+            lines = self._read_lines()
+            try:
+                for line in lines:
+                    yield line.rstrip("\n")
+            finally:
+                # Si el consumidor para antes, se descarta el resto para no desalinear la sesión
+                for _ in lines:
+                    pass
+                stats.shell_command(time.perf_counter() - start)
+
+    def _kill(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.kill()
+            self._proc.wait()
+        except OSError:
+            pass
+        self._proc = None
+
+    def close(self):
+        with self._lock:
+            if self._alive():
+                try:
+                    self._stdin.write("exit\n")
+                    self._stdin.close()
+                    self._proc.wait(timeout=2)
+                except (OSError, ValueError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(adb_path, serial=None):
+    """Devuelve la sesión compartida para ese adb/dispositivo, creándola si hace falta"""
+    key = (str(adb_path), serial)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = AdbShell(adb_path, serial)
+        return session
+
+
+def close_all_sessions():
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_all_sessions)
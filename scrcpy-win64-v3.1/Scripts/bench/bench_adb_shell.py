@@ -0,0 +1,108 @@
+"""Benchmark: un proceso `adb shell` por comando frente a la sesión persistente.
+
+Uso (Linux/macOS):  python bench/bench_adb_shell.py [--dirs 500] [--latency 0.02]
+"""
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import sd_media  # noqa: E402
+from adb_shell import AdbShell  # noqa: E402
+from device_cache import DeviceCache  # noqa: E402
+
+FAKE_ADB = Path(__file__).resolve().parent / "fake_adb.py"
+
+
+def count_processes(log_path):
+    if not log_path.exists():
+        return 0
+    with open(log_path, encoding="utf-8") as log:
+        return sum(1 for _ in log)
+
+
+def measure(label, log_path, func):
+    log_path.write_text("")
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    processes = count_processes(log_path)
+    print(f"{label:<42} {elapsed:8.3f} s {processes:7d} procesos adb")
+    return elapsed
+
+
+def check_exact_bytes(tmp):
+    """La sesión tiene que mandar a adb exactamente `{ comando\n} 2>&1; echo CENTINELA $?\n`,
+    sin "\r" (en Windows, un stdin en modo texto los añadiría). Devuelve True si es así."""
+    stdin_log = Path(tmp) / "stdin.log"
+    os.environ["FAKE_ADB_STDIN_LOG"] = str(stdin_log)
+    try:
+        with AdbShell(FAKE_ADB) as shell:
+            shell.run(["mkdir", "-p", "/storage/1A2B-3C4D/DCIM/Camera/ñ dir"])
+            sentinel = shell._sentinel
+    finally:
+        del os.environ["FAKE_ADB_STDIN_LOG"]
+    expected = (f"{{ mkdir -p '/storage/1A2B-3C4D/DCIM/Camera/ñ dir'\n}} 2>&1; echo {sentinel} $?\n"
+                "exit\n").encode("utf-8")
+    sent = stdin_log.read_bytes()
+    if sent != expected:
+        print(f"❌ La sesión adb shell envía {sent!r}\n   y debería enviar {expected!r}")
+        return False
+    print("✅ La sesión adb shell envía los comandos byte a byte, con \\n y en UTF-8.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dirs", type=int, default=500, help="número de `mkdir -p` a lanzar")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="retardo simulado por proceso adb (segundos)")
+    args = parser.parse_args()
+
+    FAKE_ADB.chmod(FAKE_ADB.stat().st_mode | stat.S_IXUSR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "device"
+        (root / "storage" / "emulated" / "0").mkdir(parents=True)
+        (root / "storage" / "self").mkdir(parents=True)
+        (root / "storage" / "1A2B-3C4D" / "DCIM" / "Camera").mkdir(parents=True)
+        log_path = Path(tmp) / "adb.log"
+
+        os.environ["FAKE_ADB_ROOT"] = str(root)
+        os.environ["FAKE_ADB_LOG"] = str(log_path)
+        os.environ["FAKE_ADB_LATENCY"] = str(args.latency)
+        sd_media.ADB_PATH = FAKE_ADB
+        sd_media.device_cache = DeviceCache(Path(tmp) / "device_cache.json")
+
+        if not check_exact_bytes(tmp):
+            sys.exit(1)
+
+        remote_dirs = [f"/storage/1A2B-3C4D/DCIM/Camera/bench/{i:05d}" for i in range(args.dirs)]
+
+        def one_shot():
+            for remote_dir in remote_dirs:
+                sd_media.run_command_list([str(FAKE_ADB), "shell", "mkdir", "-p", remote_dir])
+
+        def persistent():
+            with AdbShell(FAKE_ADB) as shell:
+                for remote_dir in remote_dirs:
+                    shell.run(["mkdir", "-p", remote_dir])
+
+        print(f"📊 {args.dirs} × mkdir -p (latencia simulada {args.latency}s por proceso)")
+        before = measure("Un proceso adb por comando", log_path, one_shot)
+        after = measure("Sesión adb shell persistente", log_path, persistent)
+        print(f"⚡ Aceleración: {before / after:.1f}x")
+
+        print()
+        measure("detect_sdcard_path() con sesión", log_path, sd_media.detect_sdcard_path)
+        print(f"   → {sd_media.detect_sdcard_path()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Varios móviles a la vez contra el adb simulado: `backup --all-devices` de dos móviles.
+
+Los dos backups escriben a la vez en las mismas bases locales (catálogo,
+duplicados...); con un ancho de banda limitado las copias duran lo bastante
+para que una transacción que no se cierre deje al otro móvil esperando hasta
+fallar con "database is locked". Comprueba que los dos terminan bien y con
+todos sus archivos (y, con --verify, que los dos se han podido verificar);
+sale con código 1 si no.
+
+Uso (Linux/macOS):
+  python bench/bench_devices.py [--camera 600] [--bandwidth 4000] [--verify]
+"""
+import argparse
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_workflows import FAKE_ADB, SCRIPTS_DIR, build_device
+
+SERIALS = ["AAA1", "BBB2"]
+
+
+def check_shared_cache(tmp):
+    """Dos cachés de verificación abiertas sobre el mismo archivo, como las de dos móviles:
+    lo que guarda una no puede dejar bloqueada a la otra hasta que se cierre."""
+    from verify import VerifyCache
+    path = tmp / "verify_cache.sqlite3"
+    with VerifyCache(path) as first, VerifyCache(path) as second:
+        first.put("remote", "/sdcard/a.jpg", 1, 1, "a" * 32)
+        start = time.perf_counter()
+        try:
+            second.put("remote", "/sdcard/b.jpg", 1, 1, "b" * 32)
+            seen = second.get("remote", "/sdcard/a.jpg", 1, 1)
+        except Exception as e:
+            print(f"❌ caché de verificación compartida: {e}")
+            return False
+    ok = seen == "a" * 32 and time.perf_counter() - start < 1
+    print(f"{'✅' if ok else '❌'} caché de verificación compartida entre dos móviles")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--camera", type=int, default=600, help="fotos/vídeos en la cámara de cada móvil")
+    parser.add_argument("--size", type=int, default=2048, help="tamaño medio en bytes de cada archivo sintético")
+    parser.add_argument("--bandwidth", type=float, default=4000,
+                        help="bytes/s simulados de cada pull/push (las copias tienen que solaparse un rato)")
+    parser.add_argument("--verify", action="store_true", help="verifica con MD5 cada backup al terminar")
+    parser.add_argument("--verbose", action="store_true", help="muestra la salida del backup")
+    args = parser.parse_args()
+
+    FAKE_ADB.chmod(FAKE_ADB.stat().st_mode | stat.S_IXUSR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for serial in SERIALS:
+            build_device(tmp / "device" / serial, args.camera, 0, args.size)
+        work = tmp / "work"
+        work.mkdir()
+        os.environ.update(
+            ADB_PATH=str(FAKE_ADB),
+            FAKE_ADB_ROOT=str(tmp / "device"),
+            FAKE_ADB_LOG=str(tmp / "adb.log"),
+            FAKE_ADB_SERIALS=",".join(SERIALS),
+            FAKE_ADB_BANDWIDTH=str(args.bandwidth),
+        )
+        os.environ.pop("ANDROID_SERIAL", None)
+        sys.path.insert(0, str(SCRIPTS_DIR))
+        import cli
+        import sd_media
+        from device_cache import DeviceCache
+        sd_media.device_cache = DeviceCache(tmp / "device_cache.json")
+
+        argv = ["backup", "2023-2024", "--all-devices"] + (["--verify"] if args.verify else [])
+        print(f"📱 {len(SERIALS)} móviles × {args.camera} archivos, {args.bandwidth:.0f} B/s: cli.py {' '.join(argv)}")
+        start_dir = os.getcwd()
+        os.chdir(work)
+        output = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                code = cli.main(argv)
+        finally:
+            os.chdir(start_dir)
+        if args.verbose:
+            print(output.getvalue())
+        print(f"   terminado en {time.perf_counter() - start:.1f} s, código de salida {code}")
+
+        ok = code == 0 and (not args.verify or check_shared_cache(tmp))
+        for serial in SERIALS:
+            copied = sum(1 for path in (work / sd_media.device_backup_dir(serial)).rglob("*")
+                         if path.suffix in (".jpg", ".mp4") and not path.name.startswith("."))
+            print(f"{'✅' if copied == args.camera else '❌'} {serial}: {copied} de {args.camera} archivos")
+            ok = ok and copied == args.camera
+        if args.verify:
+            failed = output.getvalue().count("No se pudo verificar")
+            print(f"{'✅' if not failed else '❌'} verificación: {failed} móviles sin verificar")
+            ok = ok and not failed
+        if not ok and not args.verbose:
+            print(output.getvalue()[-2000:])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
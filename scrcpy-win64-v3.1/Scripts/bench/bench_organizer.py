@@ -0,0 +1,97 @@
+"""Benchmark del organizador de WhatsApp: 8 × rglob en lista frente al recorrido único con scandir.
+
+Crea un archivo sintético (la mitad ya organizado en AÑO/MM-Mes) y mide tiempo
+y memoria máxima del recorrido, y después el tiempo de organize_whatsapp_media.
+
+Uso:  python bench/bench_organizer.py [--files 100000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import whatsapp_media  # noqa: E402
+
+
+def legacy_collect(source):
+    """El recorrido anterior: un rglob por extensión, todo acumulado en una lista"""
+    files = []
+    for ext in whatsapp_media.MEDIA_EXTENSIONS:
+        files.extend(source.rglob(f"*{ext}"))
+    return [file for file in files if not file.name.startswith(".trashed-")]
+
+
+def streaming_collect(source):
+    return sum(1 for _ in whatsapp_media.iter_unorganized_media(source))
+
+
+def build_archive(source, count):
+    images = source / "WhatsApp Images"
+    sent = images / "Sent"
+    videos = source / "WhatsApp Video"
+    organized = source / "2023" / "05-Mayo"
+    for folder in (images, sent, videos, organized):
+        folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        day = i % 28 + 1
+        if i % 2:
+            path = organized / f"IMG-202305{day:02d}-WA{i:05d}.jpg"
+        elif i % 10 == 0:
+            path = videos / f"VID-2024{i % 12 + 1:02d}{day:02d}-WA{i:05d}.mp4"
+        elif i % 7 == 0:
+            path = sent / f"IMG-2024{i % 12 + 1:02d}{day:02d}-WA{i:05d}.jpg"
+        else:
+            path = images / f"IMG-2024{i % 12 + 1:02d}{day:02d}-WA{i:05d}.jpg"
+        path.touch()
+    (images / ".nomedia").touch()
+
+
+def measure(label, func, source):
+    start = time.perf_counter()
+    result = func(source)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = result if isinstance(result, int) else len(result)
+    print(f"{label:<34} {elapsed:8.3f} s  pico {peak / 1024:10.0f} KB  {count:7d} archivos")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / whatsapp_media.LOCAL_WA_DIR
+        print(f"🛠️  Generando {args.files} archivos sintéticos...")
+        build_archive(source, args.files)
+
+        print("📊 Recorrido del árbol")
+        before = measure("8 × rglob + lista (anterior)", legacy_collect, source)
+        after = measure("scandir único + generador", streaming_collect, source)
+        print(f"⚡ Aceleración del recorrido: {before / after:.1f}x")
+
+        print()
+        os.chdir(tmp)
+        start = time.perf_counter()
+        whatsapp_media.organize_whatsapp_media()
+        print(f"⏱️  organize_whatsapp_media: {time.perf_counter() - start:.3f} s")
+        start = time.perf_counter()
+        whatsapp_media.organize_whatsapp_media()
+        print(f"⏱️  Segunda pasada (nada que mover): {time.perf_counter() - start:.3f} s")
+        os.chdir(SCRIPTS_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Benchmark de extremo a extremo de los flujos de los menús contra un móvil simulado.
+
+Crea en una carpeta temporal un móvil falso (bench/fake_adb.py) con una
+biblioteca sintética de cámara en la SD y otra de WhatsApp, y cronometra cada
+flujo tal y como lo lanza el menú (a través de cli.py): tiempo, procesos adb,
+comandos de shell y bytes movidos. Con --json se guarda el resultado para
+comparar ejecuciones y detectar regresiones.
+
+Uso (Linux/macOS):
+  python bench/bench_workflows.py [--camera 10000] [--whatsapp 10000] [--size 4096]
+                                  [--latency 0.02] [--bandwidth 40000000] [--transport tar]
+                                  [--json res.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+FAKE_ADB = Path(__file__).resolve().parent / "fake_adb.py"
+SD_UUID = "1A2B-3C4D"
+WA_MEDIA = "storage/emulated/0/Android/media/com.whatsapp/WhatsApp/Media"
+FIRST_DAY = datetime(2023, 1, 1, 9, 0, 0)
+
+# (menú, descripción, argumentos de cli.py) en el orden en que se ejecutan: primero
+# copias de día/mes para que la reorganización y el backup tengan trabajo de verdad
+WORKFLOWS = [
+    ("SD 5", "copiar una fecha", ["extract", "--date", "20240315"]),
+    ("SD 6", "copiar un mes", ["extract", "--month", "2024-03"]),
+    ("SD 7", "copiar un mes con fecha/hora", ["extract", "--month", "2024-04", "--preserve-metadata"]),
+    ("SD 10", "reorganizar copias de fecha/mes", ["reorganize"]),
+    ("SD 3", "backup de 2023-2024 por AÑO/MES", ["backup", "2023-2024"]),
+    ("SD 3", "backup repetido (nada nuevo)", ["backup", "2023-2024"]),
+    ("SD 9", "eliminar duplicados", ["dedup"]),
+    ("WA 4", "sincronizar WhatsApp", ["wa-sync"]),
+    ("WA 2", "organizar WhatsApp", ["wa-organize"]),
+    ("SD 8", "restaurar un mes de WhatsApp al móvil", ["restore", "WhatsApp Media/2024/03-Marzo"]),
+    ("SD 12", "empaquetar meses cerrados", ["pack"]),
+    ("SD 8", "restaurar un mes empaquetado", ["restore", "Fotos Camara/2024/03-Marzo"]),
+]
+
+
+def payload(index, size):
+    """Contenido distinto para cada archivo (si no, la deduplicación los enlazaría todos).
+
+    El tamaño varía entre size/2 y 3*size/2, como en una galería real: con todos
+    iguales, la deduplicación tendría que comparar cada archivo con todos los demás.
+    """
+    size = max(size // 2 + index * 7919 % (size + 1), 16)
+    head = f"{index:012d}".encode()
+    return (head * (size // len(head) + 1))[:size]
+
+
+def build_camera(root, count, size):
+    camera = root / "storage" / SD_UUID / "DCIM" / "Camera"
+    camera.mkdir(parents=True)
+    # Dos años de fotos y algún vídeo, repartidos de forma uniforme
+    step = timedelta(days=730) / max(count, 1)
+    for i in range(count):
+        moment = FIRST_DAY + step * i
+        prefix, ext = ("VID", ".mp4") if i % 20 == 0 else ("IMG", ".jpg")
+        path = camera / f"{prefix}_{moment:%Y%m%d_%H%M%S}_{i:06d}{ext}"
+        path.write_bytes(payload(i, size))
+        os.utime(path, (moment.timestamp(), moment.timestamp()))
+
+
+def build_whatsapp(root, count, size):
+    images = root / WA_MEDIA / "WhatsApp Images"
+    sent = images / "Sent"
+    videos = root / WA_MEDIA / "WhatsApp Video"
+    for folder in (images, sent, videos):
+        folder.mkdir(parents=True)
+    (images / ".nomedia").touch()
+    step = timedelta(days=730) / max(count, 1)
+    for i in range(count):
+        day = (FIRST_DAY + step * i).strftime("%Y%m%d")
+        if i % 10 == 0:
+            path = videos / f"VID-{day}-WA{i:06d}.mp4"
+        elif i % 7 == 0:
+            path = sent / f"IMG-{day}-WA{i:06d}.jpg"
+        else:
+            path = images / f"IMG-{day}-WA{i:06d}.jpg"
+        path.write_bytes(payload(1_000_000 + i, size))
+
+
+def build_device(root, camera, whatsapp, size):
+    (root / "storage" / "emulated" / "0").mkdir(parents=True)
+    (root / "storage" / "self").mkdir(parents=True)
+    build_camera(root, camera, size)
+    build_whatsapp(root, whatsapp, size)
+
+
+def collision_copies(root):
+    """Archivos nombre_N.ext junto a su nombre.ext: lo mismo descargado dos veces"""
+    copies = 0
+    for folder, _, files in os.walk(root):
+        names = set(files)
+        for name in files:
+            stem, ext = os.path.splitext(name)
+            base, _, suffix = stem.rpartition("_")
+            if suffix.isdigit() and f"{base}{ext}" in names:
+                copies += 1
+    return copies
+
+
+def run_workflow(cli, argv, log_path, verbose):
+    log_path.write_text("")
+    output = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        code = cli.main(argv)
+    elapsed = time.perf_counter() - start
+    with open(log_path, encoding="utf-8") as log:
+        processes = sum(1 for _ in log)
+    return code, elapsed, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--camera", type=int, default=1000, help="fotos/vídeos en DCIM/Camera de la SD")
+    parser.add_argument("--whatsapp", type=int, default=1000, help="archivos en las carpetas de WhatsApp")
+    parser.add_argument("--size", type=int, default=4096, help="tamaño medio en bytes de cada archivo sintético")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="retardo simulado por proceso adb (segundos)")
+    parser.add_argument("--bandwidth", type=float, default=0.0,
+                        help="bytes/s simulados de pull/push (0 = sin límite)")
+    parser.add_argument("--transport", choices=["pull", "tar"], default="pull",
+                        help="transporte de las descargas (ver cli.py --transport)")
+    parser.add_argument("--json", help="guarda los resultados en este archivo JSON")
+    parser.add_argument("--verbose", action="store_true", help="muestra la salida de cada flujo")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    FAKE_ADB.chmod(FAKE_ADB.stat().st_mode | stat.S_IXUSR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        device = tmp / "device"
+        work = tmp / "work"
+        work.mkdir()
+        log_path = tmp / "adb.log"
+
+        print(f"🛠️  Generando móvil simulado: {args.camera} archivos de cámara, "
+              f"{args.whatsapp} de WhatsApp, {args.size} bytes cada uno...")
+        start = time.perf_counter()
+        build_device(device, args.camera, args.whatsapp, args.size)
+        print(f"   listo en {time.perf_counter() - start:.1f} s")
+
+        os.environ.update(
+            ADB_PATH=str(FAKE_ADB),
+            FAKE_ADB_ROOT=str(device),
+            FAKE_ADB_LOG=str(log_path),
+            FAKE_ADB_LATENCY=str(args.latency),
+            FAKE_ADB_BANDWIDTH=str(args.bandwidth),
+        )
+        os.environ.pop("ANDROID_SERIAL", None)
+        # Se importan ya con ADB_PATH apuntando al adb simulado
+        sys.path.insert(0, str(SCRIPTS_DIR))
+        import cli
+        import sd_media
+        from device_cache import DeviceCache
+        from instrument import stats
+        sd_media.device_cache = DeviceCache(tmp / "device_cache.json")
+
+        start_dir = os.getcwd()
+        os.chdir(work)
+        results = []
+        print(f"\n{'menú':<6} {'flujo':<38} {'tiempo':>9} {'adb':>6} {'shell':>6} "
+              f"{'pull':>8} {'push':>8} {'MB':>8}  salida")
+        for menu, label, argv in WORKFLOWS:
+            code, elapsed, processes = run_workflow(cli, ["--transport", args.transport, *argv],
+                                                    log_path, args.verbose)
+            data = stats.as_dict()
+            transfers = data["transfers"]
+            pulled = sum(transfers.get(kind, {}).get("files", 0) for kind in ("pull", "tar"))
+            pushed = transfers.get("push", {}).get("files", 0)
+            nbytes = sum(entry["bytes"] for entry in transfers.values())
+            print(f"{menu:<6} {label:<38} {elapsed:8.2f}s {processes:6d} "
+                  f"{data['shell_commands']['calls']:6d} {pulled:8d} {pushed:8d} "
+                  f"{nbytes / 1024 / 1024:8.1f}  {code}")
+            results.append({
+                "menu": menu,
+                "workflow": label,
+                "argv": argv,
+                "exit_code": code,
+                "seconds": round(elapsed, 3),
+                "adb_processes": processes,
+                "report": data,
+            })
+        # Ninguno de los flujos debería traer dos veces el mismo archivo
+        duplicates = collision_copies(work / "Fotos Camara") + collision_copies(work / "WhatsApp Media")
+        if duplicates:
+            print(f"\n⚠️ {duplicates} archivos se han descargado dos veces (copias nombre_N).")
+        os.chdir(start_dir)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "params": vars(args),
+                "duplicates": duplicates,
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n📝 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Sustituto de adb para benchmarks: emula un móvil sobre un directorio local.
+
+Variables de entorno:
+  FAKE_ADB_ROOT       carpeta que hace de raíz del dispositivo (/storage/... vive dentro)
+  FAKE_ADB_LOG        fichero donde se apunta una línea por cada proceso adb lanzado
+  FAKE_ADB_LATENCY    segundos de espera por invocación (arranque de adb + handshake USB)
+  FAKE_ADB_BANDWIDTH  bytes por segundo de pull/push (por defecto, sin límite)
+  FAKE_ADB_SERIALS    serials de los móviles simulados, separados por comas (por defecto
+                      FAKE0001); con más de uno, cada móvil vive en FAKE_ADB_ROOT/<serial>
+  FAKE_ADB_STDIN_LOG  fichero donde se guardan, tal cual, los bytes que llegan a `adb shell`
+                      en modo sesión (para comprobar qué envía exactamente el script)
+
+`shell` ejecuta el comando con el sh local (ls, stat, find, mkdir, tar...) con las
+rutas /storage, /sdcard y /data traducidas a FAKE_ADB_ROOT; sin argumentos abre una
+sesión que lee los comandos de stdin, como `adb shell` sin tty. `exec-out` hace lo
+mismo con la salida binaria y `exec-in` con la entrada binaria, limitadas también
+por FAKE_ADB_BANDWIDTH.
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = os.environ.get("FAKE_ADB_ROOT", "")
+SERIALS = [s for s in os.environ.get("FAKE_ADB_SERIALS", "FAKE0001").split(",") if s]
+STREAM_CHUNK = 64 * 1024
+REMOTE_PATH_REGEX = re.compile(r"(?<![\w/.-])/(?=(?:storage|sdcard|data)\b)")
+
+
+def to_local(remote):
+    return Path(ROOT + remote)
+
+
+def rewrite_command(command):
+    return REMOTE_PATH_REGEX.sub(lambda _: ROOT + "/", command)
+
+
+def rewrite_output(text):
+    return text.replace(ROOT, "") if ROOT else text
+
+
+def log_invocation(argv):
+    log_path = os.environ.get("FAKE_ADB_LOG")
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(" ".join(argv) + "\n")
+
+
+def cmd_devices():
+    print("List of devices attached")
+    for serial in SERIALS:
+        print(f"{serial}\tdevice")
+    print()
+    return 0
+
+
+def cmd_shell(args):
+    if args:
+        result = subprocess.run(["sh", "-c", rewrite_command(" ".join(args))],
+                                capture_output=True, text=True)
+        sys.stdout.write(rewrite_output(result.stdout))
+        sys.stderr.write(rewrite_output(result.stderr))
+        return result.returncode
+
+    # Modo sesión: los comandos llegan por stdin, como con un `adb shell` sin tty
+    shell = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+    def pump():
+        for line in shell.stdout:
+            sys.stdout.write(rewrite_output(line))
+            sys.stdout.flush()
+        # Como adb real: si la shell remota termina (`exit`), termina el proceso
+        os._exit(shell.wait())
+
+    reader = threading.Thread(target=pump, daemon=True)
+    reader.start()
+    stdin_log = os.environ.get("FAKE_ADB_STDIN_LOG")
+    for raw in sys.stdin.buffer:
+        if stdin_log:
+            with open(stdin_log, "ab") as log:
+                log.write(raw)
+        try:
+            shell.stdin.write(rewrite_command(raw.decode("utf-8", errors="replace")))
+            shell.stdin.flush()
+        except BrokenPipeError:
+            break
+    try:
+        shell.stdin.close()
+    except BrokenPipeError:
+        pass
+    returncode = shell.wait()
+    reader.join()
+    return returncode
+
+
+def cmd_exec_out(args):
+    """Como `shell <comando>`, pero con la salida binaria tal cual (p. ej. un flujo tar)"""
+    shell = subprocess.Popen(["sh", "-c", rewrite_command(" ".join(args))], stdout=subprocess.PIPE)
+    out = sys.stdout.buffer
+    for chunk in iter(lambda: shell.stdout.read(STREAM_CHUNK), b""):
+        throttle(len(chunk))
+        out.write(chunk)
+    out.flush()
+    return shell.wait()
+
+
+def cmd_exec_in(args):
+    """Como `shell <comando>`, pero con la entrada binaria tal cual (p. ej. un tar que se extrae)"""
+    shell = subprocess.Popen(["sh", "-c", rewrite_command(" ".join(args))], stdin=subprocess.PIPE)
+    for chunk in iter(lambda: sys.stdin.buffer.read(STREAM_CHUNK), b""):
+        throttle(len(chunk))
+        try:
+            shell.stdin.write(chunk)
+        except BrokenPipeError:
+            break
+    try:
+        shell.stdin.close()
+    except BrokenPipeError:
+        pass
+    return shell.wait()
+
+
+def copy_entry(source, destination):
+    """Copia un archivo o carpeta y devuelve (archivos, bytes) copiados"""
+    if source.is_dir():
+        if destination.is_dir():
+            destination = destination / source.name
+        shutil.copytree(source, destination, dirs_exist_ok=True)
+        files = [p for p in destination.rglob("*") if p.is_file()]
+        return len(files), sum(p.stat().st_size for p in files)
+    if destination.is_dir():
+        destination = destination / source.name
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(source, destination)
+    return 1, destination.stat().st_size
+
+
+def throttle(nbytes):
+    """Espera lo que tardaría el cable en mover nbytes con FAKE_ADB_BANDWIDTH"""
+    bandwidth = float(os.environ.get("FAKE_ADB_BANDWIDTH", "0") or 0)
+    if bandwidth > 0:
+        time.sleep(nbytes / bandwidth)
+
+
+def cmd_transfer(args, pull):
+    args = [a for a in args if a != "-a"]
+    if len(args) < 2:
+        print("adb: error: faltan argumentos", file=sys.stderr)
+        return 1
+    *sources, destination = args
+    if pull:
+        sources = [(s, to_local(s)) for s in sources]
+        destination = Path(destination)
+    else:
+        sources = [(s, Path(s)) for s in sources]
+        destination = to_local(destination)
+        if len(sources) > 1 or destination.name == "":
+            destination.mkdir(parents=True, exist_ok=True)
+
+    failed = 0
+    copied = 0
+    for shown, source in sources:
+        if not source.exists():
+            print(f"adb: error: failed to stat remote object '{shown}': No such file or directory",
+                  file=sys.stderr)
+            failed += 1
+            continue
+        files, nbytes = copy_entry(source, destination)
+        throttle(nbytes)
+        copied += files
+    print(f"{copied} files {'pulled' if pull else 'pushed'}, 0 skipped.")
+    return 1 if failed else 0
+
+
+def main(argv):
+    global ROOT
+    log_invocation(argv)
+    latency = float(os.environ.get("FAKE_ADB_LATENCY", "0") or 0)
+    if latency:
+        time.sleep(latency)
+
+    serial = os.environ.get("ANDROID_SERIAL")
+    if len(argv) >= 2 and argv[0] == "-s":
+        serial, argv = argv[1], argv[2:]
+    if len(SERIALS) > 1 and argv[:1] != ["devices"]:
+        if serial not in SERIALS:
+            print("adb: error: more than one device/emulator" if not serial
+                  else f"adb: error: device '{serial}' not found", file=sys.stderr)
+            return 1
+        ROOT = os.path.join(ROOT, serial)
+    if not argv:
+        print("adb: falta el comando", file=sys.stderr)
+        return 1
+    # Carpeta temporal que todo Android tiene (ahí se dejan, p. ej., las listas para `tar -T`)
+    os.makedirs(os.path.join(ROOT, "data", "local", "tmp"), exist_ok=True)
+
+    command, args = argv[0], argv[1:]
+    if command == "devices":
+        return cmd_devices()
+    if command == "shell":
+        return cmd_shell(args)
+    if command == "exec-out":
+        return cmd_exec_out(args)
+    if command == "exec-in":
+        return cmd_exec_in(args)
+    if command == "pull":
+        return cmd_transfer(args, pull=True)
+    if command == "push":
+        return cmd_transfer(args, pull=False)
+    print(f"adb: comando no soportado por fake_adb: {command}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import threading
+import time
+
+from dedup import iter_files, partial_hash
+from packs import PACK_SUFFIX, is_pack, read_index
+from transfer import run_parallel
+
+CATALOG_FILE = ".media_catalog.sqlite3"
+# Al reconstruir, huellas y fechas de lo nuevo se leen en paralelo
+SCAN_WORKERS = 4
+
+
+def _prefix_bounds(folder):
+    """Rango [desde, hasta) de rutas que cuelgan de folder, para buscarlas por la clave primaria"""
+    prefix = os.path.abspath(folder) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class MediaCatalog:
+    """Catálogo persistente (SQLite) de las fotos y vídeos que hay en el PC.
+
+    Guarda ruta, origen (camera / whatsapp), fecha de captura, tamaño, mtime y
+    huella parcial de cada archivo, con índice por fecha: saber qué hay de un
+    día, un mes o una carpeta es una consulta, sin recorrer el disco ni
+    preguntar al móvil. Cada copia y reorganización lo mantiene al día;
+    `refresh` lo reconstruye para lo que se haya tocado a mano.
+    """
+
+    def __init__(self, path=CATALOG_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        # Con varios móviles a la vez, cada backup escribe en el mismo catálogo: con WAL las
+        # lecturas no esperan a nadie y cada escritura solo bloquea lo que tarda su commit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS media (
+                   path TEXT PRIMARY KEY,
+                   source TEXT NOT NULL,
+                   date TEXT,
+                   size INTEGER NOT NULL,
+                   mtime_ns INTEGER NOT NULL,
+                   hash TEXT
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS media_date ON media (date)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS media_source_date ON media (source, date)")
+        # Carpetas recorridas enteras: de ahí en adelante el catálogo las conoce completas
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS roots (
+                   path TEXT PRIMARY KEY,
+                   scanned_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def _write(self, sql, rows):
+        """Escribe y confirma enseguida: una transacción abierta dejaría esperando a los demás backups"""
+        with self._lock:
+            self._conn.executemany(sql, rows)
+            self._conn.commit()
+
+    def add(self, path, source, date=None):
+        """Da de alta (o actualiza) un archivo recién copiado o movido"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            fingerprint = partial_hash(path, st.st_size)
+        except OSError:
+            return
+        self._write("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+                    [(path, source, date, st.st_size, st.st_mtime_ns, fingerprint)])
+
+    def move(self, old_path, new_path, date=None):
+        """Apunta que un archivo ha cambiado de sitio; False si no estaba en el catálogo"""
+        old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+        try:
+            st = os.stat(new_path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, date, size, hash FROM media WHERE path = ?", (old_path,)
+            ).fetchone()
+        if row is None or row[2] != st.st_size:
+            return False
+        source, old_date, size, fingerprint = row
+        self._write("DELETE FROM media WHERE path = ?", [(old_path,)])
+        self._write("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+                    [(new_path, source, date or old_date, size, st.st_mtime_ns, fingerprint)])
+        return True
+
+    def rename(self, old_path, new_path):
+        """Cambia la ruta de un archivo catalogado sin volver a leerlo (p. ej. al empaquetarlo)"""
+        self._write("UPDATE OR REPLACE media SET path = ? WHERE path = ?",
+                    [(os.path.abspath(new_path), os.path.abspath(old_path))])
+
+    def remove(self, path):
+        self._write("DELETE FROM media WHERE path = ?", [(os.path.abspath(path),)])
+
+    def covers(self, folder):
+        """True si folder está dentro de una carpeta que el catálogo ya conoce entera"""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            roots = [root for (root,) in self._conn.execute("SELECT path FROM roots")]
+        return any(folder == root or folder.startswith(root + os.sep) for root in roots)
+
+    def files_under(self, folder):
+        """Rutas catalogadas bajo folder (ordenadas), o None si el catálogo no la conoce entera"""
+        if not self.covers(folder):
+            return None
+        low, high = _prefix_bounds(folder)
+        with self._lock:
+            return [path for (path,) in self._conn.execute(
+                "SELECT path FROM media WHERE path >= ? AND path < ? ORDER BY path", (low, high)
+            )]
+
+    def query(self, start=None, end=None, source=None, folder=None):
+        """Filas (ruta, origen, fecha, tamaño, huella) que cumplen los filtros, por fecha y ruta.
+
+        start/end son fechas YYYYMMDD (incluidas); con alguna de ellas quedan
+        fuera los archivos sin fecha.
+        """
+        conditions, params = [], []
+        if start:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end:
+            conditions.append("date <= ?")
+            params.append(end)
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if folder:
+            conditions.append("path >= ? AND path < ?")
+            params.extend(_prefix_bounds(folder))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT path, source, date, size, hash FROM media {where} ORDER BY date, path",
+                params,
+            ).fetchall()
+
+    def refresh(self, roots, date_of, extensions):
+        """Sincroniza el catálogo con el disco para roots [(carpeta, origen)].
+
+        Solo se leen (huella y fecha con date_of(ruta)) los archivos nuevos o
+        cambiados; lo que ya no está se da de baja. Lo empaquetado se apunta
+        como MM-Mes.tar/nombre con los datos de su índice. Devuelve (nuevos, bajas).
+        """
+        extensions = {ext.lower() for ext in extensions}
+        roots = [(os.path.abspath(root), source) for root, source in roots if os.path.isdir(root)]
+        with self._lock:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                     self._conn.execute("SELECT path, size, mtime_ns FROM media")}
+        seen = set()
+        changed = []
+        packed = []
+        for root, source in roots:
+            for path, st in iter_files(root):
+                if path.endswith(PACK_SUFFIX) and is_pack(path):
+                    for name, (_, _, size, mtime_ns) in read_index(path).items():
+                        member = os.path.join(os.path.abspath(path), name)
+                        seen.add(member)
+                        if known.get(member) != (size, mtime_ns):
+                            packed.append((member, source, date_of(member), size, mtime_ns, None))
+                    continue
+                if os.path.splitext(path)[1].lower() not in extensions:
+                    continue
+                path = os.path.abspath(path)
+                seen.add(path)
+                if known.get(path) != (st.st_size, st.st_mtime_ns):
+                    changed.append((path, source, st))
+
+        def describe(item):
+            path, source, st = item
+            try:
+                return path, source, date_of(path), st.st_size, st.st_mtime_ns, partial_hash(path, st.st_size)
+            except OSError:
+                return None
+
+        rows = [row for row in run_parallel(changed, describe, SCAN_WORKERS) if row] + packed
+        self._write("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+        prefixes = tuple(root + os.sep for root, _ in roots)
+        gone = [path for path in known if path.startswith(prefixes) and path not in seen]
+        self._write("DELETE FROM media WHERE path = ?", [(path,) for path in gone])
+        self._write("INSERT OR REPLACE INTO roots VALUES (?, ?)",
+                    [(root, time.time()) for root, _ in roots])
+        return len(rows), len(gone)
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
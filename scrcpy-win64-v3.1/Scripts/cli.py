@@ -0,0 +1,346 @@
+import argparse
+import os
+import shlex
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import sd_media
+import transfer
+import whatsapp_media
+from date_query import month_range, year_range
+from instrument import stats
+from packs import is_pack, pack_path
+
+# Códigos de salida para tareas programadas
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_DEVICE = 3
+
+DEVICE_COMMANDS = {"devices", "backup", "extract", "restore", "wa-sync", "verify"}
+# Órdenes que trabajan con un único móvil: con varios conectados hay que decir cuál (-s)
+SINGLE_DEVICE_COMMANDS = DEVICE_COMMANDS - {"devices"}
+
+
+# --- VALIDACIÓN DE ARGUMENTOS ---
+
+def year_span(text):
+    years = sd_media.parse_year_span(text)
+    if not years:
+        raise argparse.ArgumentTypeError(f"año inválido: {text!r} (usa YYYY o YYYY-YYYY)")
+    return years
+
+
+def date_arg(text):
+    try:
+        datetime.strptime(text, "%Y%m%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida: {text!r} (usa YYYYMMDD)")
+    return text
+
+
+def month_arg(text):
+    try:
+        value = datetime.strptime(text, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mes inválido: {text!r} (usa YYYY-MM)")
+    return f"{value.year:04d}", f"{value.month:02d}"
+
+
+# --- TRABAJOS ---
+
+def job_devices(args):
+    serials = sd_media.device_cache.devices() or []
+    for serial in serials:
+        print(serial)
+    return bool(serials)
+
+
+def job_backup(args):
+    thumbnails = args.thumbnails or None
+    if args.all_devices:
+        return sd_media.backup_all_devices(*args.years, thumbnails=thumbnails, verify=args.verify or None)
+    remote_dir = sd_media.camera_dir_ready()
+    if not remote_dir:
+        return False
+    return sd_media.backup_years(remote_dir, *args.years, thumbnails=thumbnails, verify=args.verify or None)
+
+
+def job_extract(args):
+    remote_dir = sd_media.camera_dir_ready()
+    if not remote_dir:
+        return False
+    if args.month:
+        year, month = args.month
+        start, end = month_range(year, month)
+        folder_name = f"{year}-{month}_METADATA_OK" if args.preserve_metadata else f"{year}-{month}"
+    else:
+        start = end = args.date or datetime.now().strftime("%Y%m%d")
+        folder_name = datetime.strptime(start, "%Y%m%d").strftime("%Y-%m-%d")
+    result = sd_media.extract_media_in_range(
+        remote_dir, start, end, folder_name, preserve_metadata=args.preserve_metadata
+    )
+    if result is None:
+        return False
+    total, failed = result
+    print(f"🎉 {total} archivos copiados a '{folder_name}'.")
+    return not failed
+
+
+def job_restore(args):
+    target_path = sd_media.camera_dir_ready()
+    if not target_path:
+        return False
+    local_path = os.path.abspath(os.path.expanduser(args.folder))
+    if not os.path.isdir(local_path) and not is_pack(local_path) and not is_pack(pack_path(local_path)):
+        print(f"❌ La carpeta no existe:\n{local_path}")
+        return False
+    return sd_media.restore_folder(target_path, Path(local_path), verify=args.verify or None)
+
+
+def job_wa_sync(args):
+    return whatsapp_media.sync_whatsapp(args.since or "", sd_media.current_serial())
+
+
+def job_wa_organize(args):
+    return whatsapp_media.organize_whatsapp_media()
+
+
+def job_reorganize(args):
+    return sd_media.reorganize_camera_backups(apply=not args.dry_run)
+
+
+def job_dedup(args):
+    return sd_media.deduplicate_backups()
+
+
+def job_verify(args):
+    return sd_media.verify_backup()
+
+
+def job_thumbnails(args):
+    return sd_media.generate_thumbnails()
+
+
+def job_pack(args):
+    return sd_media.pack_old_months(apply=not args.dry_run, after_months=args.months)
+
+
+def job_catalog(args):
+    return sd_media.refresh_catalog()
+
+
+def job_query(args):
+    start = end = None
+    if args.date:
+        start = end = args.date
+    elif args.month:
+        start, end = month_range(*args.month)
+    elif args.year:
+        start, end = year_range(*args.year)
+    folder = os.path.abspath(os.path.expanduser(args.folder)) if args.folder else None
+    return sd_media.query_catalog(start, end, args.source, folder, args.count) > 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Copias de seguridad del móvil sin menús, para tareas programadas.",
+        epilog="Códigos de salida: 0 = todo bien, 1 = algún trabajo falló, "
+               "2 = argumentos o archivo de trabajos inválidos, 3 = no hay móvil conectado.",
+    )
+    parser.add_argument("--dir", help="carpeta donde se guardan los backups (por defecto, la actual)")
+    parser.add_argument("-s", "--serial", help="móvil a usar si hay varios conectados (como adb -s)")
+    parser.add_argument("--transport", choices=["pull", "tar"],
+                        help="cómo se descargan los archivos: un adb pull por lote (por defecto) "
+                             "o un único flujo tar (Android 7+)")
+    parser.add_argument("--report", metavar="ARCHIVO",
+                        help="guarda en JSON los tiempos por fase, llamadas a adb y bytes transferidos")
+    parser.add_argument("--stats", action="store_true",
+                        help="muestra cada fase al terminar y un resumen de tiempos al final")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="ORDEN")
+
+    commands.add_parser("devices", help="lista los móviles conectados").set_defaults(func=job_devices)
+
+    backup = commands.add_parser("backup", help="copia y organiza por AÑO/MM-Mes (opción 3)")
+    backup.add_argument("years", type=year_span, help="YYYY o YYYY-YYYY")
+    backup.add_argument("--all-devices", action="store_true",
+                        help="todos los móviles conectados a la vez, cada uno en Moviles/<serial>/")
+    backup.add_argument("--thumbnails", action="store_true",
+                        help="genera miniaturas y la hoja de contactos de cada mes (necesita Pillow)")
+    backup.add_argument("--verify", action="store_true",
+                        help="comprueba lo copiado con MD5 en el móvil y en el PC")
+    backup.set_defaults(func=job_backup)
+
+    extract = commands.add_parser("extract", help="copia un día o un mes a su carpeta (opciones 4-7)")
+    when = extract.add_mutually_exclusive_group()
+    when.add_argument("--today", action="store_true", help="solo lo de hoy (por defecto)")
+    when.add_argument("--date", type=date_arg, help="YYYYMMDD")
+    when.add_argument("--month", type=month_arg, help="YYYY-MM")
+    extract.add_argument("--preserve-metadata", action="store_true",
+                         help="conserva fecha y hora originales (adb pull -a)")
+    extract.set_defaults(func=job_extract)
+
+    restore = commands.add_parser("restore", help="sube una carpeta local a DCIM/Camera (opción 8)")
+    restore.add_argument("folder", help="carpeta, o mes empaquetado (AÑO/MM-Mes o AÑO/MM-Mes.tar)")
+    restore.add_argument("--verify", action="store_true",
+                         help="comprueba lo subido con MD5 en el móvil y en el PC")
+    restore.set_defaults(func=job_restore)
+
+    wa_sync = commands.add_parser("wa-sync", help="sincroniza solo lo nuevo de WhatsApp")
+    wa_sync.add_argument("--since", type=date_arg, help="YYYYMMDD")
+    wa_sync.set_defaults(func=job_wa_sync)
+
+    commands.add_parser("wa-organize", help="organiza la carpeta de WhatsApp por AÑO/MM-Mes") \
+        .set_defaults(func=job_wa_organize)
+
+    reorganize = commands.add_parser("reorganize", help="pasa las copias de día/mes a AÑO/MM-Mes (sin móvil)")
+    reorganize.add_argument("--dry-run", action="store_true", help="solo muestra el plan")
+    reorganize.set_defaults(func=job_reorganize)
+
+    commands.add_parser("dedup", help="enlaza los duplicados de los backups") \
+        .set_defaults(func=job_dedup)
+
+    commands.add_parser("verify", help="comprueba con MD5 el backup AÑO/MES contra la SD") \
+        .set_defaults(func=job_verify)
+
+    commands.add_parser("thumbnails", help="miniaturas y hojas de contactos del backup (sin móvil)") \
+        .set_defaults(func=job_thumbnails)
+
+    pack = commands.add_parser("pack", help="empaqueta los meses antiguos en un .tar por mes con índice (sin móvil)")
+    pack.add_argument("--months", type=int, metavar="N",
+                      help=f"solo meses de hace al menos N meses (por defecto {sd_media.PACK_AFTER_MONTHS})")
+    pack.add_argument("--dry-run", action="store_true", help="solo muestra el plan")
+    pack.set_defaults(func=job_pack)
+
+    commands.add_parser("catalog", help="actualiza el catálogo local de fotos y vídeos (sin móvil)") \
+        .set_defaults(func=job_catalog)
+
+    query = commands.add_parser("query", help="busca en el catálogo por fecha, origen o carpeta (sin móvil)")
+    when = query.add_mutually_exclusive_group()
+    when.add_argument("--date", type=date_arg, help="YYYYMMDD")
+    when.add_argument("--month", type=month_arg, help="YYYY-MM")
+    when.add_argument("--year", type=year_span, help="YYYY o YYYY-YYYY")
+    query.add_argument("--source", choices=["camera", "whatsapp"], help="solo de la cámara o de WhatsApp")
+    query.add_argument("--folder", help="solo lo que hay dentro de esta carpeta")
+    query.add_argument("--count", action="store_true", help="solo cuántos archivos hay de cada mes")
+    query.set_defaults(func=job_query)
+
+    run = commands.add_parser("run", help="ejecuta los trabajos de un archivo (una orden por línea)")
+    run.add_argument("job_file")
+    return parser
+
+
+def device_is_ambiguous(args, serial):
+    """True (y lo explica) si el trabajo es de un solo móvil, hay varios conectados y no se ha dicho cuál"""
+    if serial or args.command not in SINGLE_DEVICE_COMMANDS or getattr(args, "all_devices", False):
+        return False
+    serials = sd_media.device_cache.devices() or []
+    if len(serials) < 2:
+        return False
+    hint = " o usa --all-devices" if args.command == "backup" else ""
+    print(f"❌ Hay {len(serials)} móviles conectados ({', '.join(serials)}): indica cuál con -s SERIAL{hint}.")
+    return True
+
+
+def read_job_file(parser, job_file):
+    """Lee y valida todas las líneas del archivo de trabajos antes de ejecutar ninguno"""
+    jobs = []
+    with open(job_file, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                args = parser.parse_args(shlex.split(line))
+            except SystemExit:
+                raise ValueError(f"{job_file}:{number}: orden inválida: {line}")
+            if args.command == "run":
+                raise ValueError(f"{job_file}:{number}: 'run' no se puede anidar")
+            jobs.append((line, args))
+    return jobs
+
+
+def run_jobs(jobs, report=None, live=False):
+    """Ejecuta los trabajos en orden compartiendo la detección del móvil y los listados remotos"""
+    stats.reset()
+    stats.live = live
+    sd_media.shared_listings = {}
+    start_dir = os.getcwd()
+    default_serial = os.environ.get("ANDROID_SERIAL")
+    default_transport = transfer.TRANSPORT
+    device_ready = None
+    results = []
+    for text, args in jobs:
+        print(f"\n▶️ {text}")
+        if args.command in DEVICE_COMMANDS:
+            if device_ready is None:
+                device_ready = sd_media.check_device(refresh=True)
+            if not device_ready:
+                results.append((EXIT_NO_DEVICE, text))
+                continue
+
+        # Cada trabajo usa su móvil (-s) o el de ANDROID_SERIAL, sin heredar el de la línea anterior
+        serial = args.serial or default_serial
+        if device_is_ambiguous(args, serial):
+            results.append((EXIT_FAILED, text))
+            continue
+        sd_media.select_device(serial)
+        transfer.TRANSPORT = args.transport or default_transport
+
+        workdir = os.path.join(start_dir, args.dir or "")
+        try:
+            os.makedirs(workdir, exist_ok=True)
+            os.chdir(workdir)
+            ok = args.func(args) is not False
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            ok = False
+        finally:
+            os.chdir(start_dir)
+        results.append((EXIT_OK if ok else EXIT_FAILED, text))
+
+    transfer.TRANSPORT = default_transport
+
+    print("\n📊 RESUMEN:")
+    for code, text in results:
+        print(f"{'✅' if code == EXIT_OK else '❌'} [{code}] {text}")
+    if live:
+        print(stats.summary())
+    if report:
+        try:
+            stats.write(os.path.join(start_dir, report))
+            print(f"📝 Informe guardado en {report}")
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el informe: {e}")
+
+    codes = {code for code, _ in results}
+    if EXIT_NO_DEVICE in codes:
+        return EXIT_NO_DEVICE
+    if EXIT_FAILED in codes:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command != "run":
+        return run_jobs([(shlex.join(argv), args)], args.report, args.stats)
+    try:
+        jobs = read_job_file(parser, args.job_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return EXIT_USAGE
+    for _, job in jobs:
+        if args.dir:
+            job.dir = os.path.join(args.dir, job.dir or "")
+        job.serial = job.serial or args.serial
+        job.transport = job.transport or args.transport
+    return run_jobs(jobs, args.report, args.stats)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import bisect
+import calendar
+import os
+import re
+from datetime import datetime
+
+
+def capture_date(entry, regex):
+    """Fecha YYYYMMDD del archivo: la del nombre si la lleva, si no la de modificación"""
+    match = regex.search(entry.name)
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(entry.mtime).strftime("%Y%m%d")
+
+
+def month_range(year, month):
+    """Primer y último día (YYYYMMDD) del mes indicado"""
+    last_day = calendar.monthrange(int(year), int(month))[1]
+    return f"{int(year):04d}{int(month):02d}01", f"{int(year):04d}{int(month):02d}{last_day:02d}"
+
+
+def year_range(first_year, last_year=None):
+    """Del 1 de enero de first_year al 31 de diciembre de last_year (o del mismo año)"""
+    return f"{int(first_year):04d}0101", f"{int(last_year or first_year):04d}1231"
+
+
+class DateIndex:
+    """Archivos multimedia del dispositivo ordenados por fecha de captura.
+
+    La fecha de cada archivo se calcula una sola vez al construir el índice
+    (con la expresión regular ya compilada) y cualquier rango [inicio, fin]
+    se resuelve con búsqueda binaria, sin volver a recorrer el listado.
+    """
+
+    def __init__(self, entries, filename_regex, extensions):
+        regex = re.compile(filename_regex)
+        extensions = {ext.lower() for ext in extensions}
+        dated = []
+        for entry in entries:
+            # Los archivos de la papelera de Android no se copian
+            if entry.name.startswith(".trashed-"):
+                continue
+            if os.path.splitext(entry.name)[1].lower() not in extensions:
+                continue
+            dated.append((capture_date(entry, regex), entry.name, entry))
+        dated.sort(key=lambda item: item[:2])
+        self._dates = [date for date, _, _ in dated]
+        self._entries = [entry for _, _, entry in dated]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def between(self, start, end):
+        """Pares (fecha, archivo) con start <= fecha <= end, ordenados por fecha"""
+        low = bisect.bisect_left(self._dates, start)
+        high = bisect.bisect_right(self._dates, end)
+        return list(zip(self._dates[low:high], self._entries[low:high]))
@@ -0,0 +1,269 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+DEDUP_INDEX_FILE = ".dedup_index.sqlite3"
+PARTIAL_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+
+def partial_hash(path, size):
+    """Huella rápida: tamaño + primeros y últimos 64 KB"""
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(PARTIAL_BYTES))
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(size - PARTIAL_BYTES)
+            digest.update(f.read(PARTIAL_BYTES))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """SHA-256 del archivo completo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_files(root):
+    """Recorre root con os.scandir devolviendo (ruta, stat) de cada archivo, sin carpetas ocultas"""
+    pending = [str(root)]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for item in entries:
+                    if item.name.startswith("."):
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        pending.append(item.path)
+                    elif item.is_file(follow_symlinks=False):
+                        yield item.path, item.stat()
+        except OSError:
+            continue
+
+
+def _stat_paths(paths):
+    """(ruta, stat) de las rutas que siguen existiendo"""
+    for path in paths:
+        try:
+            yield path, os.stat(path)
+        except OSError:
+            continue
+
+
+def replace_with_link(duplicate, original):
+    """Sustituye duplicate por un enlace duro a original de forma atómica"""
+    tmp = f"{duplicate}.{uuid.uuid4().hex[:8]}.lnk-tmp"
+    os.link(original, tmp)
+    try:
+        os.replace(tmp, duplicate)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+class DedupIndex:
+    """Índice persistente (SQLite) de tamaños y huellas de los archivos de los backups.
+
+    Primero se agrupa por tamaño; solo los tamaños repetidos se leen, con una
+    huella parcial y, si coincide, con el hash completo. Las huellas se guardan
+    por ruta + tamaño + mtime, así que un archivo sin cambios no se vuelve a leer.
+    """
+
+    def __init__(self, path=DEDUP_INDEX_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                   path TEXT PRIMARY KEY,
+                   size INTEGER NOT NULL,
+                   mtime_ns INTEGER NOT NULL,
+                   partial TEXT,
+                   full TEXT
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_size ON files (size)")
+        self._conn.commit()
+
+    def _register(self, path, st):
+        """Da de alta o actualiza un archivo; si cambió, se olvidan sus huellas"""
+        row = self._conn.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row != (st.st_size, st.st_mtime_ns):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns),
+            )
+
+    def refresh(self, roots, paths=None):
+        """Sincroniza el índice con lo que hay en disco (un recorrido por carpeta raíz).
+
+        Con paths (p. ej. sacadas del catálogo) no se recorren las carpetas: solo
+        se mira el tamaño y la fecha de esas rutas.
+        """
+        with self._lock:
+            seen = set()
+            for path, st in (_stat_paths(paths) if paths is not None
+                             else (item for root in roots for item in iter_files(root))):
+                path = os.path.abspath(path)
+                seen.add(path)
+                self._register(path, st)
+            prefixes = tuple(os.path.abspath(root) + os.sep for root in roots)
+            gone = [
+                path for (path,) in self._conn.execute("SELECT path FROM files")
+                if path.startswith(prefixes) and path not in seen
+            ]
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in gone])
+            self._conn.commit()
+
+    def _hash(self, path, size, column):
+        value = self._conn.execute(
+            f"SELECT {column} FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if value and value[0]:
+            return value[0]
+        value = partial_hash(path, size) if column == "partial" else full_hash(path)
+        self._conn.execute(f"UPDATE files SET {column} = ? WHERE path = ?", (value, path))
+        return value
+
+    def _identical(self, path_a, path_b, size):
+        if self._hash(path_a, size, "partial") != self._hash(path_b, size, "partial"):
+            return False
+        return self._hash(path_a, size, "full") == self._hash(path_b, size, "full")
+
+    def duplicate_groups(self):
+        """Grupos de rutas con contenido idéntico (solo se leen los tamaños repetidos)"""
+        with self._lock:
+            groups = []
+            sizes = [size for (size,) in self._conn.execute(
+                "SELECT size FROM files WHERE size > 0 GROUP BY size HAVING COUNT(*) > 1"
+            )]
+            for size in sizes:
+                paths = [path for (path,) in self._conn.execute(
+                    "SELECT path FROM files WHERE size = ? ORDER BY path", (size,)
+                )]
+                by_hash = {}
+                for path in paths:
+                    try:
+                        by_hash.setdefault(self._hash(path, size, "partial"), []).append(path)
+                    except OSError:
+                        continue
+                for candidates in by_hash.values():
+                    if len(candidates) < 2:
+                        continue
+                    by_full = {}
+                    for path in candidates:
+                        try:
+                            by_full.setdefault(self._hash(path, size, "full"), []).append(path)
+                        except OSError:
+                            continue
+                    groups.extend(group for group in by_full.values() if len(group) > 1)
+            self._conn.commit()
+            return groups
+
+    def find_duplicate(self, path):
+        """Ruta de un archivo ya indexado idéntico a path, o None. path queda indexado"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        if not st.st_size:
+            return None
+        with self._lock:
+            self._register(path, st)
+            candidates = [other for (other,) in self._conn.execute(
+                "SELECT path FROM files WHERE size = ? AND path != ?", (st.st_size, path)
+            )]
+            match = None
+            for other in candidates:
+                try:
+                    other_st = os.stat(other)
+                    if os.path.samestat(st, other_st) or other_st.st_size != st.st_size:
+                        continue
+                    # Si el candidato cambió desde que se indexó, sus huellas ya no valen
+                    self._register(other, other_st)
+                    if self._identical(path, other, st.st_size):
+                        match = other
+                        break
+                except OSError:
+                    continue
+            self._conn.commit()
+            return match
+
+    def link_duplicates(self, paths):
+        """Convierte en enlace duro cada archivo de paths que ya exista en el índice.
+
+        Devuelve (enlazados, bytes ahorrados).
+        """
+        linked = saved = 0
+        for path in paths:
+            try:
+                original = self.find_duplicate(path)
+                if original is None:
+                    continue
+                size = os.path.getsize(path)
+                replace_with_link(path, original)
+                self.touch(path)
+                linked += 1
+                saved += size
+            except OSError:
+                # Sin soporte de enlaces duros (p. ej. exFAT) o archivo desaparecido
+                continue
+        return linked, saved
+
+    def touch(self, path):
+        """Vuelve a registrar path tras cambiarlo (conservando sus huellas si no cambió el contenido)"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT partial, full FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, *(row or (None, None))),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def deduplicate(roots, index_path=DEDUP_INDEX_FILE, paths=None):
+    """Enlaza con enlaces duros todos los duplicados exactos bajo roots.
+
+    En cada grupo se conserva el primer archivo (por orden de ruta) y el resto
+    pasa a ser un enlace duro a él. Con paths se revisan esas rutas en lugar de
+    recorrer roots. Devuelve (enlazados, bytes ahorrados).
+    """
+    roots = [Path(root) for root in roots if Path(root).exists()]
+    linked = saved = 0
+    with DedupIndex(index_path) as index:
+        index.refresh(roots, paths)
+        for group in index.duplicate_groups():
+            original, *duplicates = group
+            for duplicate in duplicates:
+                try:
+                    if os.path.samefile(original, duplicate):
+                        continue
+                    size = os.path.getsize(duplicate)
+                    replace_with_link(duplicate, original)
+                    index.touch(duplicate)
+                    linked += 1
+                    saved += size
+                except OSError:
+                    continue
+    return linked, saved
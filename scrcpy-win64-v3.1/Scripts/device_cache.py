@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Cuánto se da por bueno el último `adb devices` dentro de una misma sesión
+DEVICE_TTL = 120
+# Cuánto se recuerda (entre sesiones) si un volumen tiene o no DCIM/Camera
+VOLUME_TTL = 7 * 24 * 3600
+
+
+def parse_devices(output):
+    """Convierte la salida de `adb devices` en una lista de (serial, estado)"""
+    devices = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and not line.startswith("List of devices"):
+            devices.append((parts[0], parts[1]))
+    return devices
+
+
+def choose_serial(serials):
+    """El único serial de la lista o, si hay varios, el que elija el usuario; None si no hay ninguno"""
+    if not serials or len(serials) == 1:
+        return serials[0] if serials else None
+    for number, serial in enumerate(serials, 1):
+        print(f"{number}. {serial}")
+    choice = input("📱 Elige el móvil: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(serials):
+        return serials[int(choice) - 1]
+    print("❌ Opción inválida.")
+    return None
+
+
+class DeviceCache:
+    """Caché del descubrimiento de dispositivos y volúmenes.
+
+    Los dispositivos conectados y la carpeta de cámara ya localizada se guardan
+    solo en memoria y se invalidan cuando el móvil se desconecta. Lo que se sabe
+    de cada volumen (por serial del móvil y UUID de la SD) se guarda en disco,
+    así una sesión nueva no vuelve a inspeccionar volúmenes sin DCIM/Camera.
+    """
+
+    def __init__(self, path, device_ttl=DEVICE_TTL, volume_ttl=VOLUME_TTL):
+        self.path = Path(path)
+        self.device_ttl = device_ttl
+        self.volume_ttl = volume_ttl
+        self._lock = threading.Lock()
+        self._devices = None
+        self._devices_at = 0
+        self._camera_paths = {}
+        self._volumes = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._volumes, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def devices(self):
+        """Serials listos según el último `adb devices`, o None si hay que volver a preguntar"""
+        with self._lock:
+            if self._devices is None or time.time() - self._devices_at > self.device_ttl:
+                return None
+            return list(self._devices)
+
+    def set_devices(self, serials):
+        with self._lock:
+            self._devices = list(serials)
+            self._devices_at = time.time()
+            # Lo localizado para móviles que ya no están deja de valer
+            for serial in list(self._camera_paths):
+                if serial not in self._devices:
+                    del self._camera_paths[serial]
+
+    def camera_path(self, serial):
+        with self._lock:
+            return self._camera_paths.get(serial)
+
+    def set_camera_path(self, serial, path):
+        with self._lock:
+            self._camera_paths[serial] = path
+
+    def volume_has_camera(self, serial, volume):
+        """True/False si se sabe (y no ha caducado) si el volumen tiene DCIM/Camera; None si no"""
+        with self._lock:
+            entry = self._volumes.get(serial or "", {}).get(volume)
+        if not entry or time.time() - entry.get("checked_at", 0) > self.volume_ttl:
+            return None
+        return bool(entry.get("camera"))
+
+    def set_volume_has_camera(self, serial, volume, has_camera):
+        with self._lock:
+            self._volumes.setdefault(serial or "", {})[volume] = {
+                "camera": bool(has_camera),
+                "checked_at": time.time(),
+            }
+            self._save()
+
+    def invalidate(self):
+        """Olvida dispositivos y rutas de esta sesión (p. ej. tras una desconexión)"""
+        with self._lock:
+            self._devices = None
+            self._camera_paths.clear()
@@ -0,0 +1,165 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LIVE_LINE_WIDTH = 100
+# Con esta variable (ruta a un .json), los menús guardan las medidas de la sesión tras cada opción
+REPORT_ENV = "ORGANIZER_REPORT"
+ADB_KIND_REGEX = re.compile(r'(?:^|\s|")(devices|shell|pull|push|exec-out|exec-in)(?=\s|$)')
+
+
+def adb_kind(command):
+    """Subcomando de adb (pull, push, shell...) de una lista de argumentos o una línea de comandos"""
+    if not isinstance(command, str):
+        args = [str(arg) for arg in command[1:]]
+        if args[:1] == ["-s"]:
+            args = args[2:]
+        return args[0] if args else "adb"
+    match = ADB_KIND_REGEX.search(command)
+    return match.group(1) if match else "adb"
+
+
+class RunStats:
+    """Medidas de una ejecución: tiempo por fase, llamadas a adb y bytes transferidos.
+
+    Es seguro entre hilos. Con varios hilos (p. ej. varios móviles) el tiempo de
+    una fase es la suma de todos ellos, así que puede superar al tiempo total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.live = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+            self.phases = {}
+            self.processes = {}
+            self.shell_commands = [0, 0.0]
+            self.transfers = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.phases.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+            if self.live:
+                # \r y relleno: si hay una barra de progreso a medias en la línea, se sobrescribe
+                print(f"\r⏱️ {name}: {elapsed:.2f} s".ljust(LIVE_LINE_WIDTH))
+
+    def timed(self, name=None):
+        """Decorador: mide cada llamada a la función como una fase"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def adb_process(self, command, seconds):
+        """Apunta un proceso adb lanzado (y lo que tardó)"""
+        kind = adb_kind(command)
+        with self._lock:
+            entry = self.processes.setdefault(kind, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def shell_command(self, seconds):
+        """Apunta un comando enviado a una sesión de adb shell ya abierta"""
+        with self._lock:
+            self.shell_commands[0] += 1
+            self.shell_commands[1] += seconds
+
+    def transfer(self, direction, files, nbytes, seconds):
+        """Apunta un lote transferido: archivos y bytes que llegaron y su duración"""
+        with self._lock:
+            entry = self.transfers.setdefault(direction, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += files
+            entry[2] += nbytes
+            entry[3] += seconds
+
+    def as_dict(self):
+        with self._lock:
+            transfers = {}
+            for direction, (batches, files, nbytes, seconds) in self.transfers.items():
+                transfers[direction] = {
+                    "batches": batches,
+                    "files": files,
+                    "bytes": nbytes,
+                    "seconds": round(seconds, 3),
+                    "bytes_per_second": round(nbytes / seconds) if seconds else None,
+                    "seconds_per_file": round(seconds / files, 4) if files else None,
+                }
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._start, 3),
+                "phases": {name: {"calls": calls, "seconds": round(seconds, 3)}
+                           for name, (calls, seconds) in self.phases.items()},
+                "adb_processes": {kind: {"calls": calls, "seconds": round(seconds, 3)}
+                                  for kind, (calls, seconds) in self.processes.items()},
+                "shell_commands": {"calls": self.shell_commands[0],
+                                   "seconds": round(self.shell_commands[1], 3)},
+                "transfers": transfers,
+            }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+
+    def summary(self):
+        """Resumen legible de la ejecución"""
+        data = self.as_dict()
+        lines = [f"⏱️ Tiempo total: {data['wall_seconds']:.2f} s"]
+        for name, entry in sorted(data["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"   {name:<28} {entry['seconds']:9.2f} s  ×{entry['calls']}")
+        processes = data["adb_processes"]
+        if processes:
+            detail = ", ".join(f"{kind} ×{entry['calls']}" for kind, entry in sorted(processes.items()))
+            lines.append(f"🔌 Procesos adb: {sum(e['calls'] for e in processes.values())} ({detail})")
+        if data["shell_commands"]["calls"]:
+            lines.append(f"🐚 Comandos en la sesión de shell: {data['shell_commands']['calls']}")
+        for direction, entry in data["transfers"].items():
+            rate = entry["bytes_per_second"] or 0
+            lines.append(f"📦 {direction}: {entry['files']} archivos, {entry['bytes']} bytes en "
+                         f"{entry['batches']} lotes, {rate / 1024 / 1024:.2f} MB/s")
+        return "\n".join(lines)
+
+
+# Medidas de la ejecución en curso, compartidas por todos los módulos
+stats = RunStats()
+timed = stats.timed
+
+
+def menu_report_path():
+    """Ruta absoluta del informe de los menús según ORGANIZER_REPORT, o None si no se pide"""
+    path = os.environ.get(REPORT_ENV)
+    return os.path.abspath(path) if path else None
+
+
+def save_menu_report(path, final=False):
+    """Guarda el informe de la sesión del menú; al salir (final) muestra además el resumen"""
+    if not path:
+        return
+    if final:
+        print(stats.summary())
+    try:
+        stats.write(path)
+        if final:
+            print(f"📝 Informe guardado en {path}")
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el informe: {e}")
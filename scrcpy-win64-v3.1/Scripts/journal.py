@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+JOURNAL_NAME = ".transfer_journal.sqlite3"
+COMMIT_EVERY = 200
+
+
+class TransferJournal:
+    """Diario previo (SQLite) de las descargas en curso dentro de una carpeta de backup.
+
+    Antes de empezar a copiar se apunta cada archivo con su ruta local definitiva
+    y se confirma en disco; al terminar cada uno se borra su entrada. Si la copia
+    se corta (cable, Ctrl-C, apagón), lo que queda en el diario es justo lo que
+    había en marcha: en la siguiente ejecución se reutilizan las mismas rutas y
+    lo que ya llegó entero se reconoce por su tamaño sin volver a descargarlo.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(str(self.base_dir / JOURNAL_NAME), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   remote_path TEXT PRIMARY KEY,
+                   size INTEGER NOT NULL,
+                   mtime INTEGER NOT NULL,
+                   local_path TEXT NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def planned(self):
+        """Dict ruta_remota → (size, mtime, ruta_local) de lo que quedó a medias"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT remote_path, size, mtime, local_path FROM jobs"
+            ).fetchall()
+        return {remote: (size, mtime, self.base_dir / local) for remote, size, mtime, local in rows}
+
+    def plan(self, jobs):
+        """Apunta (ruta_remota, size, mtime, ruta_local) antes de descargar y lo confirma en disco"""
+        rows = []
+        for remote_path, size, mtime, local_path in jobs:
+            try:
+                relative = Path(local_path).resolve().relative_to(self.base_dir.resolve())
+            except ValueError:
+                relative = Path(local_path).resolve()
+            rows.append((remote_path, size, mtime, relative.as_posix()))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def finish(self, remote_path):
+        """Quita del diario un archivo que ya está en su sitio"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE remote_path = ?", (remote_path,))
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from packs import packed_size
+
+MANIFEST_NAME = ".backup_manifest.sqlite3"
+COMMIT_EVERY = 200
+
+
+class BackupManifest:
+    """Registro persistente (SQLite) de lo que ya está copiado en la carpeta de backup.
+
+    Cada archivo remoto se identifica por su ruta, tamaño y fecha de modificación;
+    si coinciden con lo registrado y la copia local sigue ahí, no hace falta
+    volver a descargarlo.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(str(self.base_dir / MANIFEST_NAME), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                   remote_path TEXT PRIMARY KEY,
+                   size INTEGER NOT NULL,
+                   mtime INTEGER NOT NULL,
+                   local_path TEXT NOT NULL,
+                   backed_up_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def lookup(self, remote_path):
+        """Devuelve (size, mtime, ruta_local) registrados para ese archivo remoto, o None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, local_path FROM files WHERE remote_path = ?", (remote_path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], self.base_dir / row[2]
+
+    def is_backed_up(self, remote_path, size, mtime):
+        """True si el archivo remoto, con ese tamaño y fecha, ya tiene una copia local completa.
+
+        La copia puede estar suelta o dentro del paquete de su mes.
+        """
+        entry = self.lookup(remote_path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return False
+        try:
+            return entry[2].stat().st_size == size
+        except OSError:
+            return packed_size(entry[2]) == size
+
+    def _relative(self, local_path):
+        try:
+            relative = Path(local_path).resolve().relative_to(self.base_dir.resolve())
+        except ValueError:
+            relative = Path(local_path).resolve()
+        return relative.as_posix()
+
+    def record(self, remote_path, size, mtime, local_path):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (remote_path, size, mtime, self._relative(local_path), time.time()),
+            )
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def relocate(self, old_local, new_local, size):
+        """Apunta a new_local lo registrado en old_local con ese tamaño (p. ej. renombrado al empaquetar)"""
+        with self._lock:
+            self._conn.execute("UPDATE files SET local_path = ? WHERE local_path = ? AND size = ?",
+                               (self._relative(new_local), self._relative(old_local), size))
+            self._conn.commit()
+
+    def forget(self, remote_path):
+        """Quita un archivo del registro para que la próxima copia lo vuelva a descargar"""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE remote_path = ?", (remote_path,))
+            self._conn.commit()
+
+    def entries(self):
+        """Lista de (ruta_remota, size, mtime, ruta_local) de todo lo registrado"""
+        with self._lock:
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT remote_path, size, mtime, local_path FROM files"
+            ).fetchall()
+        return [(remote, size, mtime, self.base_dir / local) for remote, size, mtime, local in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
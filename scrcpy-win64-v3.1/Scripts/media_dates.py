@@ -0,0 +1,330 @@
+import os
+import sqlite3
+import struct
+import threading
+from datetime import datetime
+
+MEDIA_DATES_FILE = ".media_dates.sqlite3"
+# Cada lectura está acotada: nunca se carga un vídeo (ni una foto) entero en memoria
+SEGMENT_LIMIT = 64 * 1024
+META_BOX_LIMIT = 1024 * 1024
+# Segundos entre 1904-01-01 (origen de las fechas MP4/MOV) y 1970-01-01
+MP4_EPOCH_OFFSET = 2082844800
+MIN_VALID_YEAR = 1990
+
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+
+
+def _valid(date_str):
+    """date_str (YYYYMMDD) si es una fecha real y razonable, si no None"""
+    try:
+        value = datetime.strptime(date_str, "%Y%m%d")
+    except ValueError:
+        return None
+    return date_str if value.year >= MIN_VALID_YEAR else None
+
+
+# --- EXIF (TIFF) ---
+
+def _ifd_entries(tiff, offset, order):
+    """Devuelve {etiqueta: (tipo, cuenta, valor u offset)} de un IFD"""
+    entries = {}
+    if offset + 2 > len(tiff):
+        return entries
+    (count,) = struct.unpack_from(order + "H", tiff, offset)
+    for i in range(count):
+        start = offset + 2 + i * 12
+        if start + 12 > len(tiff):
+            break
+        tag, kind, number, value = struct.unpack_from(order + "HHII", tiff, start)
+        entries[tag] = (kind, number, value, start + 8)
+    return entries
+
+
+def _ascii_value(tiff, entry):
+    kind, number, value, inline = entry
+    if kind != 2:
+        return None
+    start = inline if number <= 4 else value
+    raw = tiff[start:start + number]
+    return raw.split(b"\0", 1)[0].decode("ascii", "ignore")
+
+
+def exif_date(tiff):
+    """YYYYMMDD de DateTimeOriginal (o, en su defecto, DateTimeDigitized/DateTime) de un bloque TIFF"""
+    if tiff[:2] == b"II":
+        order = "<"
+    elif tiff[:2] == b"MM":
+        order = ">"
+    else:
+        return None
+    try:
+        (ifd0,) = struct.unpack_from(order + "I", tiff, 4)
+        main = _ifd_entries(tiff, ifd0, order)
+        candidates = []
+        if TAG_EXIF_IFD in main:
+            exif = _ifd_entries(tiff, main[TAG_EXIF_IFD][2], order)
+            candidates += [exif.get(TAG_DATETIME_ORIGINAL), exif.get(TAG_DATETIME_DIGITIZED)]
+        candidates.append(main.get(TAG_DATETIME))
+        for entry in candidates:
+            if entry is None:
+                continue
+            text = _ascii_value(tiff, entry)
+            # Formato EXIF: "YYYY:MM:DD HH:MM:SS"
+            if text and len(text) >= 10:
+                date_str = _valid(text[:10].replace(":", ""))
+                if date_str:
+                    return date_str
+    except struct.error:
+        return None
+    return None
+
+
+def jpeg_date(f):
+    """Recorre los segmentos JPEG hasta el APP1 de EXIF, sin pasar de la cabecera"""
+    f.seek(2)
+    while True:
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return None
+        marker, length = header[1], struct.unpack(">H", header[2:])[0]
+        # SOS: empiezan los datos de imagen, ya no hay más metadatos
+        if marker == 0xDA or length < 2:
+            return None
+        if marker == 0xE1:
+            segment = f.read(min(length - 2, SEGMENT_LIMIT))
+            if segment.startswith(b"Exif\0\0"):
+                return exif_date(segment[6:])
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+# --- ISO BMFF (MP4, MOV, 3GP, HEIC) ---
+
+def _boxes(f, start, end):
+    """Recorre las cajas entre start y end leyendo solo sus cabeceras: (tipo, inicio datos, fin)"""
+    position = start
+    while end is None or position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        data = position + 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack(">Q", large)[0]
+            data += 8
+        elif size == 0:
+            # La caja llega hasta el final del archivo
+            f.seek(0, os.SEEK_END)
+            size = f.tell() - position
+        if size < data - position:
+            return
+        yield kind, data, position + size
+        position += size
+
+
+def _find_box(f, kind, start, end):
+    for box_kind, data, box_end in _boxes(f, start, end):
+        if box_kind == kind:
+            return data, box_end
+    return None
+
+
+def mvhd_date(f):
+    """Fecha de creación de la cabecera mvhd (dentro de moov), esté moov al principio o al final"""
+    moov = _find_box(f, b"moov", 0, None)
+    if not moov:
+        return None
+    mvhd = _find_box(f, b"mvhd", *moov)
+    if not mvhd:
+        return None
+    f.seek(mvhd[0])
+    payload = f.read(12)
+    if len(payload) < 8:
+        return None
+    version = payload[0]
+    if version == 1:
+        if len(payload) < 12:
+            return None
+        created = struct.unpack(">Q", payload[4:12])[0]
+    else:
+        created = struct.unpack(">I", payload[4:8])[0]
+    if not created:
+        return None
+    try:
+        moment = datetime.fromtimestamp(created - MP4_EPOCH_OFFSET)
+    except (OverflowError, OSError, ValueError):
+        return None
+    return _valid(moment.strftime("%Y%m%d"))
+
+
+def _read_uint(data, offset, size):
+    if size == 0:
+        return 0, offset
+    fmt = {2: ">H", 4: ">I", 8: ">Q"}[size]
+    return struct.unpack_from(fmt, data, offset)[0], offset + size
+
+
+def _exif_item_id(iinf):
+    """Identificador del ítem 'Exif' dentro de la caja iinf (ya leída)"""
+    version = iinf[0]
+    offset = 4 + (2 if version == 0 else 4)
+    while offset + 8 <= len(iinf):
+        size, kind = struct.unpack_from(">I4s", iinf, offset)
+        if size < 8:
+            return None
+        if kind == b"infe":
+            infe = iinf[offset + 8:offset + size]
+            infe_version = infe[0]
+            if infe_version >= 2:
+                id_size = 2 if infe_version == 2 else 4
+                item_id, pos = _read_uint(infe, 4, id_size)
+                item_type = infe[pos + 2:pos + 6]
+                if item_type == b"Exif":
+                    return item_id
+        offset += size
+    return None
+
+
+def _item_location(iloc, wanted):
+    """(offset, longitud) del primer tramo del ítem wanted según la caja iloc (ya leída)"""
+    version = iloc[0]
+    offset_size, length_size = iloc[4] >> 4, iloc[4] & 0x0F
+    base_offset_size = iloc[5] >> 4
+    index_size = iloc[5] & 0x0F if version in (1, 2) else 0
+    pos = 6
+    count, pos = _read_uint(iloc, pos, 2 if version < 2 else 4)
+    for _ in range(count):
+        item_id, pos = _read_uint(iloc, pos, 2 if version < 2 else 4)
+        method = 0
+        if version in (1, 2):
+            method, pos = _read_uint(iloc, pos, 2)
+            method &= 0x0F
+        pos += 2  # data_reference_index
+        base_offset, pos = _read_uint(iloc, pos, base_offset_size)
+        extents, pos = _read_uint(iloc, pos, 2)
+        first = None
+        for _ in range(extents):
+            if index_size:
+                _, pos = _read_uint(iloc, pos, index_size)
+            extent_offset, pos = _read_uint(iloc, pos, offset_size)
+            extent_length, pos = _read_uint(iloc, pos, length_size)
+            if first is None:
+                first = (base_offset + extent_offset, extent_length)
+        if item_id == wanted:
+            # Solo se entienden ítems guardados directamente en el archivo
+            return first if method == 0 else None
+    return None
+
+
+def heif_date(f):
+    """EXIF de una HEIC: busca el ítem 'Exif' en meta/iinf + meta/iloc y lee solo ese tramo"""
+    meta = _find_box(f, b"meta", 0, None)
+    if not meta:
+        return None
+    # meta es una FullBox: 4 bytes de versión y flags antes de las cajas hijas
+    start, end = meta[0] + 4, meta[1]
+    children = {}
+    for kind, data, box_end in _boxes(f, start, end):
+        if kind in (b"iinf", b"iloc") and box_end - data <= META_BOX_LIMIT:
+            f.seek(data)
+            children[kind] = f.read(box_end - data)
+    if b"iinf" not in children or b"iloc" not in children:
+        return None
+    try:
+        item_id = _exif_item_id(children[b"iinf"])
+        if item_id is None:
+            return None
+        location = _item_location(children[b"iloc"], item_id)
+    except (struct.error, KeyError, IndexError):
+        return None
+    if not location:
+        return None
+    offset, length = location
+    f.seek(offset)
+    payload = f.read(min(length or SEGMENT_LIMIT, SEGMENT_LIMIT))
+    if len(payload) < 4:
+        return None
+    # Los 4 primeros bytes indican dónde empieza la cabecera TIFF (tras "Exif\0\0")
+    tiff_start = 4 + struct.unpack(">I", payload[:4])[0]
+    return exif_date(payload[tiff_start:])
+
+
+def metadata_date(path):
+    """Fecha de captura YYYYMMDD leída de la propia foto/vídeo (EXIF o mvhd), o None"""
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(12)
+            if magic[:2] == b"\xff\xd8":
+                return jpeg_date(f)
+            if magic[4:8] == b"ftyp":
+                brand = magic[8:12]
+                if brand in (b"heic", b"heix", b"mif1", b"msf1", b"heim", b"heis"):
+                    return heif_date(f)
+                return mvhd_date(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+class MediaDateCache:
+    """Caché persistente (SQLite) de la fecha leída de cada archivo.
+
+    Se guarda por ruta + tamaño + mtime, también cuando el archivo no tiene
+    fecha, así que un archivo sin cambios no se vuelve a abrir.
+    """
+
+    def __init__(self, path=MEDIA_DATES_FILE):
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS dates (
+                   path TEXT PRIMARY KEY,
+                   size INTEGER NOT NULL,
+                   mtime_ns INTEGER NOT NULL,
+                   date TEXT
+               )"""
+        )
+        self._conn.commit()
+
+    def date_of(self, path, st=None):
+        """Fecha de captura de path (YYYYMMDD) o None; solo se lee el archivo si no está en caché"""
+        path = os.path.abspath(path)
+        st = st or os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, date FROM dates WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[:2] == (st.st_size, st.st_mtime_ns):
+            return row[2]
+
+        date_str = metadata_date(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dates VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, date_str),
+            )
+            self._pending += 1
+            if self._pending >= 200:
+                self._conn.commit()
+                self._pending = 0
+        return date_str
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
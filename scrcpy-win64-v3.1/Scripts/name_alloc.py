@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+from packs import packed_names
+
+SUFFIX_REGEX = re.compile(r'^(.*)_(\d+)$')
+
+
+def _key(name):
+    # En Windows "IMG.jpg" e "img.JPG" son el mismo archivo
+    return os.path.normcase(name)
+
+
+def split_suffix(name, names):
+    """(nombre original, N) si name es la copia nombre_N de un nombre que está en names, o None.
+
+    Solo cuenta como sufijo de colisión si el original también está: en
+    IMG_20240101_123456.jpg, el _123456 es la hora, no una copia de IMG_20240101.jpg.
+    """
+    stem, ext = os.path.splitext(name)
+    match = SUFFIX_REGEX.match(stem)
+    if match and _key(match.group(1) + ext) in names:
+        return match.group(1) + ext, int(match.group(2))
+    return None
+
+
+def original_names(names):
+    """Dict nombre → nombre original (sin el sufijo _N de colisión) de los nombres de una carpeta"""
+    keys = {_key(name) for name in names}
+    return {name: (split_suffix(name, keys) or (name,))[0] for name in names}
+
+
+def _remember(names, highest, name):
+    """Apunta name como ocupado y, si es una copia _N, actualiza el sufijo más alto de su original"""
+    names.add(_key(name))
+    _count_suffix(names, highest, name)
+
+
+def _count_suffix(names, highest, name):
+    split = split_suffix(name, names)
+    if split:
+        stem, ext = os.path.splitext(split[0])
+        key = (_key(stem), _key(ext))
+        highest[key] = max(highest.get(key, 0), split[1])
+
+
+class NameAllocator:
+    """Reparte nombres libres (`nombre`, `nombre_1`, `nombre_2`...) por carpeta de destino.
+
+    Cada carpeta (y su paquete, si el mes está empaquetado) se lista una sola vez; a partir de ahí se recuerda qué nombres
+    están ocupados y el sufijo más alto usado por cada nombre base, así que el
+    siguiente nombre libre sale sin preguntar al disco. Es seguro entre hilos.
+    Todos los archivos que se creen en esas carpetas durante la operación deben
+    pedir su nombre aquí.
+    """
+
+    def __init__(self):
+        self._folders = {}
+        self._lock = threading.Lock()
+
+    def _load(self, folder):
+        # Lo que ya está dentro del paquete del mes también ocupa su nombre
+        found = list(packed_names(folder))
+        try:
+            with os.scandir(folder) as entries:
+                found += [item.name for item in entries]
+        except FileNotFoundError:
+            pass
+        # Primero todos los nombres: una copia _N puede salir en el listado antes que su original
+        names = {_key(name) for name in found}
+        highest = {}
+        for name in found:
+            _count_suffix(names, highest, name)
+        state = self._folders[folder] = (names, highest)
+        return state
+
+    def reserve(self, path):
+        """Marca path como ocupado aunque todavía no exista (p. ej. una descarga pendiente)"""
+        path = Path(path)
+        with self._lock:
+            names, highest = self._folders.get(path.parent) or self._load(path.parent)
+            _remember(names, highest, path.name)
+
+    def allocate(self, folder, filename):
+        """Reserva y devuelve la ruta libre para filename dentro de folder"""
+        folder = Path(folder)
+        with self._lock:
+            names, highest = self._folders.get(folder) or self._load(folder)
+            if _key(filename) not in names:
+                names.add(_key(filename))
+                return folder / filename
+
+            stem, ext = os.path.splitext(filename)
+            key = (_key(stem), _key(ext))
+            counter = highest.get(key, 0) + 1
+            candidate = f"{stem}_{counter}{ext}"
+            # Red de seguridad: con `highest` al día no debería dar más de una vuelta
+            while _key(candidate) in names:
+                counter += 1
+                candidate = f"{stem}_{counter}{ext}"
+            highest[key] = counter
+            names.add(_key(candidate))
+            return folder / candidate
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import tarfile
+import threading
+import uuid
+from pathlib import Path
+
+# Un mes empaquetado: AÑO/MM-Mes.tar (tar sin comprimir, se abre con cualquier programa)
+# y al lado su índice oculto .MM-Mes.tar.index.json con la posición de cada archivo
+PACK_SUFFIX = ".tar"
+INDEX_SUFFIX = ".index.json"
+COPY_CHUNK = 1024 * 1024
+# Fin de un tar: dos bloques de ceros
+END_OF_ARCHIVE = b"\0" * (2 * tarfile.BLOCKSIZE)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def pack_path(folder):
+    """Paquete que corresponde a una carpeta de mes (AÑO/MM-Mes → AÑO/MM-Mes.tar)"""
+    folder = Path(folder)
+    return folder.with_name(folder.name + PACK_SUFFIX)
+
+
+def index_path(pack):
+    pack = Path(pack)
+    return pack.with_name(f".{pack.name}{INDEX_SUFFIX}")
+
+
+def is_pack(path):
+    path = Path(path)
+    return path.suffix == PACK_SUFFIX and index_path(path).is_file()
+
+
+def _blocks(size):
+    """Bytes que ocupan size bytes de datos en el tar (rellenos hasta el bloque)"""
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def _load(pack):
+    """{"end": fin del último archivo, "members": {nombre: [cabecera, datos, tamaño, mtime_ns]}}"""
+    index = index_path(pack)
+    try:
+        key = index.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(str(index))
+        if cached and cached[0] == key:
+            return cached[1]
+    try:
+        with open(index, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    with _cache_lock:
+        _cache[str(index)] = (key, data)
+    return data
+
+
+def _save(pack, data):
+    index = index_path(pack)
+    tmp = index.with_name(f"{index.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, index)
+
+
+def read_index(pack):
+    """Dict nombre → (cabecera, datos, tamaño, mtime_ns) de un paquete ({} si no lo es)"""
+    data = _load(pack)
+    return {name: tuple(entry) for name, entry in data["members"].items()} if data else {}
+
+
+def packed_size(path):
+    """Tamaño de path si ya no está suelto sino dentro del paquete de su carpeta, o None"""
+    path = Path(path)
+    data = _load(pack_path(path.parent))
+    entry = data["members"].get(path.name) if data else None
+    return entry[2] if entry else None
+
+
+def packed_names(folder):
+    """Dict nombre → tamaño de lo empaquetado de una carpeta de mes"""
+    return {name: entry[2] for name, entry in read_index(pack_path(folder)).items()}
+
+
+def rebuild_index(pack):
+    """Vuelve a sacar el índice recorriendo las cabeceras del tar (p. ej. si se borró)"""
+    members = {}
+    end = 0
+    with tarfile.open(pack, "r:") as archive:
+        for member in archive:
+            if member.isfile():
+                members[member.name] = [member.offset, member.offset_data, member.size,
+                                        int(member.mtime) * 1_000_000_000]
+                end = member.offset_data + _blocks(member.size)
+    _save(pack, {"end": end, "members": members})
+    return len(members)
+
+
+def _unique_name(name, members):
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while name in members:
+        name = f"{stem}_{counter}{ext}"
+        counter += 1
+    return name
+
+
+def pack_folder(folder):
+    """Mete los archivos sueltos de una carpeta de mes en su paquete (creándolo o ampliándolo).
+
+    Cada archivo se añade al final del tar; el índice se guarda (de forma
+    atómica) antes de borrar ningún original, así que un corte a medias solo
+    deja datos sin indexar que la próxima vez se sobrescriben. Los ocultos
+    (índices, hojas de contactos) se quedan. Devuelve [(ruta original, nombre en el paquete)].
+    """
+    folder = Path(folder)
+    with os.scandir(folder) as entries:
+        files = sorted((item.name, item.stat()) for item in entries
+                       if not item.name.startswith(".") and item.is_file(follow_symlinks=False))
+    if not files:
+        return []
+    pack = pack_path(folder)
+    data = _load(pack) if pack.exists() else None
+    if pack.exists() and data is None:
+        rebuild_index(pack)
+        data = _load(pack)
+    data = data or {"end": 0, "members": {}}
+    members = data["members"]
+
+    packed = []
+    with open(pack, "r+b" if pack.exists() else "wb") as f:
+        # Lo que haya detrás del último archivo indexado (fin del tar o un corte) se descarta
+        f.seek(data["end"])
+        f.truncate()
+        archive = tarfile.open(fileobj=f, mode="w", format=tarfile.GNU_FORMAT)
+        for name, st in files:
+            entry = members.get(name)
+            if entry and entry[2:] == [st.st_size, st.st_mtime_ns]:
+                # Ya empaquetado en una pasada que se cortó antes de borrar el original
+                packed.append((folder / name, name))
+                continue
+            arcname = _unique_name(name, members)
+            info = archive.gettarinfo(str(folder / name), arcname=arcname)
+            # En el móvil nadie es dueño de nada: sin usuario ni grupo del PC
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            info.mode = 0o644
+            header = archive.offset
+            with open(folder / name, "rb") as source:
+                archive.addfile(info, source)
+            members[arcname] = [header, archive.offset - _blocks(info.size), info.size, st.st_mtime_ns]
+            packed.append((folder / name, arcname))
+        data["end"] = archive.offset
+        archive.close()
+        f.flush()
+        os.fsync(f.fileno())
+    _save(pack, data)
+
+    for path, _ in packed:
+        os.remove(path)
+    try:
+        folder.rmdir()
+    except OSError:
+        # Quedan archivos ocultos (p. ej. la hoja de contactos): la carpeta se mantiene
+        pass
+    return packed
+
+
+def iter_member(pack, name, chunk=COPY_CHUNK):
+    """Contenido de un archivo empaquetado, por bloques, leído directamente con seek"""
+    _, data, size, _ = read_index(pack)[name]
+    with open(pack, "rb") as f:
+        f.seek(data)
+        while size > 0:
+            block = f.read(min(chunk, size))
+            if not block:
+                raise OSError(f"paquete cortado: {pack}")
+            size -= len(block)
+            yield block
+
+
+def member_md5(pack, name):
+    digest = hashlib.md5()
+    for block in iter_member(pack, name):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_member(pack, name, destination):
+    """Copia un archivo empaquetado a destination con su fecha original"""
+    mtime_ns = read_index(pack)[name][3]
+    with open(destination, "wb") as f:
+        for block in iter_member(pack, name):
+            f.write(block)
+    os.utime(destination, ns=(mtime_ns, mtime_ns))
+
+
+def iter_raw_tar(pack, names, on_member=None):
+    """Un tar con solo esos archivos, copiando tal cual sus bloques del paquete (cabecera incluida).
+
+    No se decodifica ni se vuelve a escribir nada: es lo que se envía al móvil
+    para extraerlo allí. on_member(nombre, tamaño) se llama tras enviar cada uno.
+    """
+    members = read_index(pack)
+    with open(pack, "rb") as f:
+        for name in names:
+            header, data, size, _ = members[name]
+            f.seek(header)
+            remaining = data + _blocks(size) - header
+            while remaining > 0:
+                block = f.read(min(COPY_CHUNK, remaining))
+                if not block:
+                    raise OSError(f"paquete cortado: {pack}")
+                remaining -= len(block)
+                yield block
+            if on_member:
+                on_member(name, size)
+    yield END_OF_ARCHIVE
@@ -0,0 +1,35 @@
+import re
+import shlex
+from collections import namedtuple
+
+STAT_LINE_REGEX = re.compile(r'^(\d+) (\d+) (/.+)$')
+
+# Un archivo del dispositivo: ruta completa, nombre, tamaño en bytes y mtime (epoch)
+RemoteEntry = namedtuple("RemoteEntry", "path name size mtime")
+
+
+def index_command(remote_dir):
+    """Comando de shell que lista todo el árbol con tamaño y mtime en una sola llamada"""
+    return f"find {shlex.quote(remote_dir)} -type f -exec stat -c '%s %Y %n' {{}} +"
+
+
+def parse_stat_line(line):
+    match = STAT_LINE_REGEX.match(line)
+    if not match:
+        return None
+    path = match.group(3)
+    return RemoteEntry(path, path.rsplit("/", 1)[-1], int(match.group(1)), int(match.group(2)))
+
+
+def iter_remote_files(session, remote_dir):
+    """Recorre remote_dir en el dispositivo con una sola llamada y va devolviendo RemoteEntry"""
+    for line in session.stream(index_command(remote_dir)):
+        entry = parse_stat_line(line)
+        if entry is not None:
+            yield entry
+
+
+def build_remote_index(session, remote_dir):
+    """Índice en memoria del árbol remoto, ordenado por nombre"""
+    return sorted(iter_remote_files(session, remote_dir), key=lambda entry: entry.name)
+
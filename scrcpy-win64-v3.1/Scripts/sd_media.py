@@ -1,16 +1,56 @@
-import subprocess
+import errno
 import os
 import re
+import subprocess
+import tarfile
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 import shutil
 
+from adb_shell import get_session
+from catalog import MediaCatalog
+from date_query import DateIndex, month_range, year_range
+from dedup import DedupIndex, deduplicate, iter_files
+from device_cache import DeviceCache, choose_serial, parse_devices
+from instrument import menu_report_path, save_menu_report, stats, timed
+from journal import TransferJournal
+from manifest import MANIFEST_NAME, BackupManifest
+from name_alloc import NameAllocator, original_names
+from packs import (PACK_SUFFIX, extract_member, is_pack, iter_raw_tar, member_md5, pack_folder,
+                   pack_path, packed_names, packed_size, read_index)
+from remote_index import build_remote_index
+from thumbnails import CONTACT_SHEET_NAME, ThumbnailBuilder, available as thumbnails_available
+from transfer import (CombinedProgress, ProgressDisplay, format_bytes, pull_files,
+                      push_files, push_tar_stream, remove_stale_staging, run_parallel)
+from verify import remote_md5, verify_pairs
+from whatsapp_media import LOCAL_WA_DIR, local_date as whatsapp_local_date
+
 BASE_DIR = Path(__file__).parent.parent  
-ADB_PATH = BASE_DIR / "adb.exe"
+# ADB_PATH en el entorno permite usar otro adb (el de Linux/macOS o bench/fake_adb.py)
+ADB_PATH = Path(os.environ.get("ADB_PATH") or BASE_DIR / "adb.exe")
 SCRCPY_PATH = BASE_DIR / "scrcpy.exe"
 LOCAL_BACKUP_DIR = "Fotos Camara"
+# Con varios móviles a la vez, cada uno tiene su propio backup en Moviles/<serial>/
+DEVICES_DIR = "Moviles"
 MEDIA_EXTENSIONS = [".jpg", ".jpeg", ".png", ".mp4", ".mov", ".heic", ".avi", ".3gp"]
+# Las SD en FAT32 guardan la hora de modificación con una resolución de 2 segundos
+MTIME_TOLERANCE = 2
 FILENAME_DATE_REGEX = r'(?:[A-Z]+_)?(\d{8})_\d{6}.*'
+# Carpetas que crean las opciones 4-7: YYYY-MM-DD, YYYY-MM y YYYY-MM_METADATA_OK
+LOCAL_FOLDER_REGEX = re.compile(r'^(\d{4})-(\d{2})(?:-(\d{2}))?(?:_METADATA_OK)?$')
+# Miniaturas y hoja de contactos de cada mes tras el backup (opción 3); necesita Pillow
+GENERATE_THUMBNAILS = False
+# Comprobar con MD5 (en el móvil y en el PC) lo copiado en backups y restauraciones
+VERIFY_TRANSFERS = False
+# Meses que tienen que pasar para dar por cerrada una carpeta AÑO/MM-Mes y poder empaquetarla
+PACK_AFTER_MONTHS = 3
+MONTH_FOLDER_REGEX = re.compile(r'^(\d{2})-')
+# Opciones del menú que trabajan con un solo móvil (con varios conectados, se pregunta cuál)
+DEVICE_CHOICES = {"2", "3", "4", "5", "6", "7", "8"}
+
+DEVICE_CACHE_FILE = BASE_DIR / ".device_cache.json"
 
 MESES_ES = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -18,10 +58,18 @@ MESES_ES = {
     9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"
 }
 
+device_cache = DeviceCache(DEVICE_CACHE_FILE)
+# Listados remotos compartidos entre los trabajos de una misma ejecución (la CLI lo activa con {})
+shared_listings = None
+# Móvil con el que trabaja cada hilo (con varios móviles a la vez, uno por hilo)
+_selected = threading.local()
+_dedup_lock = threading.Lock()
+
 # --- FUNCIONES ---
 
 def run_command_list(cmd_list):
     """Ejecuta un comando con subprocess.run usando lista de argumentos"""
+    start = time.perf_counter()
     try:
         result = subprocess.run(cmd_list, capture_output=True, text=True)
         if result.returncode != 0:
@@ -29,102 +77,220 @@ def run_command_list(cmd_list):
         return result.stdout.strip()
     except Exception as e:
         return f"Error: {e}"
+    finally:
+        stats.adb_process(cmd_list, time.perf_counter() - start)
+
+def run_shell_command(args):
+    """Ejecuta un comando en la sesión persistente de adb shell (sin lanzar un adb por llamada)"""
+    try:
+        returncode, output = get_session(ADB_PATH, current_serial()).run(args)
+    except Exception as e:
+        # La sesión no se pudo (re)abrir: seguramente el móvil se ha desconectado
+        device_cache.invalidate()
+        return f"Error: {e}"
+    if returncode != 0:
+        return f"Error: {output}"
+    return output
+
+@timed()
+def check_device(refresh=False):
+    """Comprueba que hay un móvil listo; reutiliza el último `adb devices` si es reciente"""
+    if not refresh and device_cache.devices():
+        print("✅ Dispositivo conectado.")
+        return True
 
-def check_device():
     print("🔍 Buscando dispositivos conectados...")
     result = run_command_list([str(ADB_PATH), "devices"])
     print(result)
-    if "device" in result and "unauthorized" not in result:
+    devices = parse_devices(result)
+    ready = [serial for serial, state in devices if state == "device"]
+    if ready and not any(state == "unauthorized" for _, state in devices):
+        device_cache.set_devices(ready)
         print("✅ Dispositivo conectado.")
         return True
-    elif "unauthorized" in result:
+    device_cache.invalidate()
+    if any(state == "unauthorized" for _, state in devices):
         print("⚠️ Autoriza la conexión en tu móvil.")
     else:
         print("❌ No se detectó ningún dispositivo.")
     return False
 
+def select_device(serial):
+    """Hace que las llamadas a adb de este hilo vayan al móvil serial (None = el único conectado)"""
+    _selected.serial = serial
+
+def current_serial():
+    serial = getattr(_selected, "serial", None)
+    if serial:
+        return serial
+    # Con varios móviles no se elige uno cualquiera: sin serial, adb se niega en lugar de adivinar
+    devices = device_cache.devices()
+    return devices[0] if devices and len(devices) == 1 else None
+
+def choose_device():
+    """Elige el móvil de este hilo: el único conectado o, si hay varios, el que diga el usuario"""
+    if not check_device():
+        return None
+    serial = choose_serial(device_cache.devices())
+    select_device(serial)
+    return serial
+
+def device_ready():
+    """Comprueba que hay un móvil listo y que se sabe cuál usar si hay varios"""
+    if not check_device():
+        return False
+    if not current_serial():
+        print("❌ Hay varios móviles conectados: elige uno (--serial en la línea de comandos) "
+              "o usa la opción 11 para copiarlos todos.")
+        return False
+    return True
+
 def start_scrcpy():
     print("🚀 Iniciando scrcpy...")
-    result = subprocess.run([str(SCRCPY_PATH)])
+    result = subprocess.run([str(SCRCPY_PATH), f"--serial={current_serial()}"])
     if result.returncode != 0:
         print(f"⚠️ Error al iniciar scrcpy: {result}")
 
+@timed()
 def detect_sdcard_path():
-    output = run_command_list([str(ADB_PATH), "shell", "ls", "/storage"])
+    serial = current_serial()
+    cached = device_cache.camera_path(serial)
+    if cached:
+        return cached
+
+    output = run_shell_command(["ls", "/storage"])
+    if output.startswith("Error"):
+        return None
     for line in output.splitlines():
         if "-" in line and len(line) == 9:
-            test = run_command_list([str(ADB_PATH), "shell", "ls", f"/storage/{line}/DCIM/Camera"])
-            if "No such file or directory" not in test:
-                return f"/storage/{line}/DCIM/Camera"
+            # Se recuerda por UUID de volumen si tiene DCIM/Camera, para no volver a mirarlo
+            camera_path = f"/storage/{line}/DCIM/Camera"
+            has_camera = device_cache.volume_has_camera(serial, line)
+            if has_camera is None:
+                test = run_shell_command(["ls", "-d", camera_path])
+                has_camera = not test.startswith("Error")
+                # Un fallo de conexión no dice nada del volumen: solo se recuerdan respuestas claras
+                if has_camera or "No such file or directory" in test:
+                    device_cache.set_volume_has_camera(serial, line, has_camera)
+            if has_camera:
+                device_cache.set_camera_path(serial, camera_path)
+                return camera_path
     return None
 
-def list_files_on_device(remote_dir):
-    output = run_command_list([str(ADB_PATH), "shell", "ls", remote_dir])
-    if "No such file" in output or "Error" in output:
+@timed()
+def index_files_on_device(remote_dir, reuse=True):
+    """Lista todo el árbol remoto con tamaño y fecha de cada archivo en una sola llamada"""
+    serial = current_serial()
+    if reuse and shared_listings is not None and (serial, remote_dir) in shared_listings:
+        return shared_listings[serial, remote_dir]
+    try:
+        entries = build_remote_index(get_session(ADB_PATH, serial), remote_dir)
+    except Exception as e:
+        print(f"⚠️ Error listando {remote_dir}: {e}")
         return []
-    return [line.strip() for line in output.splitlines() if line.strip()]
+    if shared_listings is not None:
+        shared_listings[serial, remote_dir] = entries
+    return entries
+
+@timed()
+def create_remote_dirs(remote_dirs, batch_size=500):
+    """Crea todas las carpetas remotas indicadas con un `mkdir -p` por cada bloque de rutas"""
+    remote_dirs = sorted(remote_dirs)
+    for i in range(0, len(remote_dirs), batch_size):
+        result = run_shell_command(["mkdir", "-p", *remote_dirs[i:i + batch_size]])
+        if result.startswith("Error"):
+            print(f"⚠️ Error creando carpetas en el móvil: {result}")
+
+def pull_selected_files(entries, local_dir, preserve_metadata=False, dates=None):
+    """Descarga en lote los archivos del índice remoto indicados a local_dir y devuelve cuántos llegaron.
+
+    dates (ruta remota → YYYYMMDD) es la fecha con la que se apunta cada archivo en el catálogo.
+    """
+    jobs = [(entry.path, Path(local_dir) / entry.name) for entry in entries]
+    sizes = {entry.path: entry.size for entry in entries}
+    total = 0
 
-def pull_file_from_device(remote_path, local_path):
-    local_path = str(local_path)
-    cmd = [str(ADB_PATH), "pull", remote_path, local_path]
-    return run_command_list(cmd)
+    def on_result(remote_path, local_path, error, nbytes):
+        nonlocal total
+        if error:
+            print(f"⚠️ Error extrayendo {local_path.name}: {error}")
+            return
+        total += 1
+        catalog.add(local_path, "camera", (dates or {}).get(remote_path) or local_capture_date(local_path))
+        if preserve_metadata:
+            print(f"✅ {local_path.name} copiado (metadatos conservados).")
+        else:
+            print(f"✅ {local_path.name} copiado.")
 
-def push_file_to_device(local_path, remote_path):
-    local_path = str(local_path)
-    cmd = [str(ADB_PATH), "push", "-a", local_path, remote_path]
-    return run_command_list(cmd)
+    with MediaCatalog() as catalog:
+        pull_files(ADB_PATH, jobs, preserve_metadata, on_result=on_result, sizes=sizes,
+                   serial=current_serial())
+    return total
 
 # --- FUNCIONES DE EXTRACCIÓN ---
 
-def extract_today_media_from_sd():
-    if not check_device():
-        return
+def camera_dir_ready():
+    """Comprueba el móvil y devuelve la carpeta DCIM/Camera de la SD, o None"""
+    if not device_ready():
+        return None
 
     remote_dir = detect_sdcard_path()
     if not remote_dir:
         print("❌ No se encontró la carpeta DCIM/Camera en la SD externa.")
-        return
+    return remote_dir
 
-    hoy = datetime.now().strftime("%Y%m%d")
-    folder_name = datetime.now().strftime("%Y-%m-%d")
+def camera_media_index(remote_dir):
+    """Lista la cámara una sola vez y devuelve sus fotos/vídeos ordenados por fecha"""
+    return DateIndex(index_files_on_device(remote_dir), FILENAME_DATE_REGEX, MEDIA_EXTENSIONS)
+
+@timed()
+def extract_media_in_range(remote_dir, start, end, folder_name, preserve_metadata=False):
+    """Copia a folder_name lo fechado entre start y end (YYYYMMDD).
+
+    Devuelve (copiados, fallidos), o None si no se pudo listar nada.
+    """
     local_dir = Path(folder_name)
     local_dir.mkdir(parents=True, exist_ok=True)
 
-    files = list_files_on_device(remote_dir)
-    if not files:
+    index = camera_media_index(remote_dir)
+    if not index:
         print("❌ No hay archivos en la carpeta remota.")
-        return
+        return None
 
-    total = 0
-    for filename in files:
-        if not any(filename.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
-            continue
+    dated = index.between(start, end)
+    selected = [entry for _, entry in dated]
+    dates = {entry.path: date_str for date_str, entry in dated}
+    total = pull_selected_files(selected, local_dir, preserve_metadata, dates)
+    return total, len(selected) - total
 
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        if not match:
-            continue
+def ask_year_month():
+    """Pide año y mes; devuelve (año, mes con dos cifras) o None si no son válidos"""
+    year = input("📅 Introduce el AÑO (YYYY): ").strip()
+    month = input("📅 Introduce el MES (MM): ").strip()
 
-        if match.group(1) != hoy:
-            continue
+    if not (year.isdigit() and month.isdigit() and 1 <= int(month) <= 12):
+        print("❌ Año o mes inválidos.")
+        return None
+    return year, month.zfill(2)
 
-        remote_path = f"{remote_dir}/{filename}"
-        local_path = local_dir / filename
-        pull_result = pull_file_from_device(remote_path, local_path)
-        if "Error" in pull_result:
-            print(f"⚠️ Error extrayendo {filename}: {pull_result}")
-            continue
-        total += 1
-        print(f"✅ {filename} copiado.")
+def extract_today_media_from_sd():
+    remote_dir = camera_dir_ready()
+    if not remote_dir:
+        return
 
-    print(f"\n🎉 Proceso completado. {total} archivos copiados a '{folder_name}'.")
+    hoy = datetime.now().strftime("%Y%m%d")
+    folder_name = datetime.now().strftime("%Y-%m-%d")
 
-def extract_media_from_specific_date():
-    if not check_device():
+    result = extract_media_in_range(remote_dir, hoy, hoy, folder_name)
+    if result is None:
         return
+    total, _ = result
 
-    remote_dir = detect_sdcard_path()
+    print(f"\n🎉 Proceso completado. {total} archivos copiados a '{folder_name}'.")
+
+def extract_media_from_specific_date():
+    remote_dir = camera_dir_ready()
     if not remote_dir:
-        print("❌ No se encontró la carpeta DCIM/Camera en la SD externa.")
         return
 
     fecha_input = input("📅 Introduce la fecha deseada (formato YYYYMMDD): ").strip()
@@ -135,167 +301,329 @@ def extract_media_from_specific_date():
         return
 
     folder_name = datetime_obj.strftime("%Y-%m-%d")
-    local_dir = Path(folder_name)
-    local_dir.mkdir(parents=True, exist_ok=True)
-
-    files = list_files_on_device(remote_dir)
-    if not files:
-        print("❌ No hay archivos en la carpeta remota.")
+    result = extract_media_in_range(remote_dir, fecha_input, fecha_input, folder_name)
+    if result is None:
         return
-
-    total = 0
-    for filename in files:
-        if not any(filename.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
-            continue
-
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        if not match:
-            continue
-
-        if match.group(1) != fecha_input:
-            continue
-
-        remote_path = f"{remote_dir}/{filename}"
-        local_path = local_dir / filename
-        pull_result = pull_file_from_device(remote_path, local_path)
-        if "Error" in pull_result:
-            print(f"⚠️ Error extrayendo {filename}: {pull_result}")
-            continue
-        total += 1
-        print(f"✅ {filename} copiado.")
+    total, _ = result
 
     print(f"\n🎉 Proceso completado. {total} archivos copiados a '{folder_name}'.")
 
-def copy_and_organize_media():
-    if not check_device():
+def device_backup_dir(serial):
+    """Carpeta de backup propia de un móvil: Moviles/<serial>/Fotos Camara"""
+    # Los serials por wifi llevan ':' (192.168.1.5:5555), que Windows no admite en carpetas
+    safe = re.sub(r'[^\w.-]', "_", serial)
+    return Path(DEVICES_DIR) / safe / LOCAL_BACKUP_DIR
+
+def backup_all_devices(first_year, last_year, serials=None, thumbnails=None, verify=None):
+    """Copia esos años de todos los móviles conectados a la vez, cada uno a su carpeta.
+
+    Cada móvil va en su propio hilo (con su propio `adb -s`) y todos comparten
+    una barra de progreso. Las miniaturas, si se piden, se hacen al final para
+    no lanzar un pool de procesos por móvil. Devuelve True si no falló nada.
+    """
+    if not check_device(refresh=True):
+        return False
+    serials = serials or device_cache.devices()
+    print(f"📱 {len(serials)} móviles: {', '.join(serials)}")
+    progress = CombinedProgress()
+
+    def worker(serial):
+        select_device(serial)
+        remote_dir = detect_sdcard_path()
+        if not remote_dir:
+            progress.message(f"❌ [{serial}] No se encontró la carpeta DCIM/Camera en la SD externa.")
+            return serial, False
+        backup_dir = device_backup_dir(serial)
+        return serial, backup_years(remote_dir, first_year, last_year, backup_dir, progress.part(serial),
+                                    thumbnails=False, verify=verify)
+
+    results = run_parallel(serials, worker, workers=len(serials))
+    progress.finish()
+    if thumbnails is None:
+        thumbnails = GENERATE_THUMBNAILS
+    if thumbnails:
+        for serial in serials:
+            generate_thumbnails(device_backup_dir(serial))
+
+    print("📊 RESUMEN POR MÓVIL:")
+    for serial, ok in sorted(results):
+        print(f"{'✅' if ok else '⚠️ '} {serial} → '{device_backup_dir(serial).as_posix()}'")
+    return all(ok for _, ok in results)
+
+def copy_all_devices_media():
+    years = parse_year_span(input("📅 Introduce el AÑO a copiar de todos los móviles (YYYY o YYYY-YYYY): "))
+    if not years:
+        print("❌ Año inválido.")
         return
+    backup_all_devices(*years)
+
+def parse_year_span(text):
+    """'2024' o '2022-2024' → (primer año, último año), o None si no es válido"""
+    first_year, _, last_year = text.strip().partition("-")
+    last_year = last_year or first_year
+    if not all(year.isdigit() and len(year) == 4 for year in (first_year, last_year)) \
+            or first_year > last_year:
+        return None
+    return first_year, last_year
+
+def month_folder_path(base_dir, date_str):
+    """Carpeta AÑO/MM-Mes de base_dir que le toca a una fecha YYYYMMDD"""
+    month_number = int(date_str[4:6])
+    return Path(base_dir) / date_str[:4] / f"{month_number:02d}-{MESES_ES[month_number]}"
+
+def existing_copies(folder):
+    """Dict (nombre original, tamaño) → [rutas] de lo que ya hay en una carpeta de mes, suelto o en su paquete.
+
+    Las copias nombre_N de una descarga repetida cuentan con el nombre original.
+    """
+    folder = Path(folder)
+    sizes = packed_names(folder)
+    try:
+        with os.scandir(folder) as entries:
+            for item in entries:
+                if not item.name.startswith(".") and item.is_file():
+                    sizes[item.name] = item.stat().st_size
+    except FileNotFoundError:
+        pass
+    copies = {}
+    for name, original in sorted(original_names(sizes).items()):
+        copies.setdefault((original, sizes[name]), []).append(folder / name)
+    return copies
+
+def adopt_existing_copies(base_dir, files, manifest):
+    """Apunta en el manifiesto lo de files [(archivo, fecha)] que ya está en su carpeta AÑO/MM-Mes
+    con el mismo nombre y tamaño, aunque venga de un backup sin manifiesto o de la reorganización.
+
+    Devuelve lo que sigue faltando.
+    """
+    if not files:
+        return files
+    # Una copia local vale para un solo archivo del móvil: las que ya tienen dueño no se reparten
+    claimed = {local_path for _, _, _, local_path in manifest.entries()}
+    inventories = {}
+    missing = []
+    for entry, date_str in files:
+        folder = month_folder_path(base_dir, date_str)
+        if folder not in inventories:
+            inventories[folder] = existing_copies(folder)
+        candidates = [path for path in inventories[folder].get((entry.name, entry.size), [])
+                      if path not in claimed]
+        if not candidates:
+            missing.append((entry, date_str))
+            continue
+        claimed.add(candidates[0])
+        manifest.record(entry.path, entry.size, entry.mtime, candidates[0])
+    return missing
 
-    remote_dir = detect_sdcard_path()
+def copy_and_organize_media():
+    remote_dir = camera_dir_ready()
     if not remote_dir:
-        print("❌ No se encontró la carpeta DCIM/Camera en la SD externa.")
         return
 
-    year_selected = input("📅 Introduce el AÑO a organizar (YYYY): ").strip()
-    if not (year_selected.isdigit() and len(year_selected) == 4):
+    years = parse_year_span(input("📅 Introduce el AÑO a organizar (YYYY, o YYYY-YYYY para varios): "))
+    if not years:
         print("❌ Año inválido.")
         return
+    backup_years(remote_dir, *years)
+
+@timed()
+def backup_years(remote_dir, first_year, last_year, backup_dir=None, progress_factory=None,
+                 thumbnails=None, verify=None):
+    """Copia a backup_dir (LOCAL_BACKUP_DIR)/AÑO/MM-Mes lo de esos años que falte; True si no falló nada.
+
+    Con progress_factory (p. ej. CombinedProgress.part) la barra y el resumen final
+    los lleva quien la pasa, para poder mostrar varios móviles a la vez. Con
+    thumbnails (por defecto GENERATE_THUMBNAILS) se van haciendo miniaturas de lo
+    que llega, en otros procesos, y al final la hoja de contactos de cada mes.
+    Con verify (por defecto VERIFY_TRANSFERS) lo descargado se comprueba con MD5.
+    """
+    year_selected = first_year if first_year == last_year else f"{first_year}-{last_year}"
 
     # Crear carpeta base local
-    base_dir = Path(LOCAL_BACKUP_DIR)
+    base_dir = Path(backup_dir or LOCAL_BACKUP_DIR)
     base_dir.mkdir(parents=True, exist_ok=True)
 
-    # Listar archivos del dispositivo
+    # Listar archivos del dispositivo (una sola vez, aunque se pidan varios años)
     print(f"📋 Escaneando archivos en {remote_dir}...")
-    files = list_files_on_device(remote_dir)
-    
-    if not files:
+    index = camera_media_index(remote_dir)
+
+    if not index:
         print("❌ No hay archivos en la carpeta remota.")
-        return
+        return False
 
-    # Filtrar archivos por año
+    # Archivos del año (o años) seleccionado, por fecha del nombre o, si no la lleva, de modificación
     print("🔍 Filtrando archivos por año...")
-    files_to_copy = []
-    for filename in files:
-        # Ignorar archivos trashed
-        if filename.startswith(".trashed-"):
-            continue
-        
-        # Solo extensiones de media
-        if not any(filename.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
-            continue
-        
-        # Extraer fecha del nombre del archivo
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        if not match:
-            continue
-        
-        date_str = match.group(1)
-        year = date_str[:4]
-        
-        # Solo archivos del año seleccionado
-        if year == year_selected:
-            files_to_copy.append(filename)
+    files_to_copy = [(entry, date_str) for date_str, entry in index.between(*year_range(first_year, last_year))]
 
     if not files_to_copy:
         print(f"❌ No se encontraron archivos del año {year_selected} en la SD.")
-        return
+        return True
 
     print(f"📥 Encontrados {len(files_to_copy)} archivos del año {year_selected}.")
+
+    manifest = BackupManifest(base_dir)
+    journal = TransferJournal(base_dir)
+    catalog = MediaCatalog()
+    dates = {entry.path: date_str for entry, date_str in files_to_copy}
+
+    # Copia interrumpida: lo que ya llegó entero a la ruta apuntada en el diario cuenta como copiado
+    resumed = journal.planned()
+    recovered = 0
+    for remote_path, (size, mtime, local_path) in list(resumed.items()):
+        try:
+            complete = local_path.stat().st_size == size
+        except OSError:
+            complete = False
+        if complete:
+            manifest.record(remote_path, size, mtime, local_path)
+            journal.finish(remote_path)
+            catalog.add(local_path, "camera", dates.get(remote_path) or local_capture_date(local_path))
+            del resumed[remote_path]
+            recovered += 1
+    if resumed or recovered:
+        print(f"♻️ Reanudando una copia interrumpida ({recovered} archivos ya habían llegado completos).")
+    for folder in {local_path.parent for _, _, local_path in resumed.values()}:
+        remove_stale_staging(folder)
+
+    # Omitir lo que ya está en el backup (mismo tamaño y fecha) sin volver a descargarlo
+    pending = [
+        (entry, date_str) for entry, date_str in files_to_copy
+        if not manifest.is_backed_up(entry.path, entry.size, entry.mtime)
+    ]
+    if len(pending) < len(files_to_copy):
+        print(f"⏭️ {len(files_to_copy) - len(pending)} archivos ya estaban en el backup, se omiten.")
+        files_to_copy = pending
+    # Lo que ya está en su carpeta sin estar en el manifiesto (un backup anterior al manifiesto,
+    # o movido ahí al reorganizar las copias de día/mes) se apunta en vez de descargarlo otra vez
+    missing = adopt_existing_copies(base_dir, files_to_copy, manifest)
+    if len(missing) < len(files_to_copy):
+        print(f"⏭️ {len(files_to_copy) - len(missing)} archivos ya estaban en su carpeta del backup, se omiten.")
+        files_to_copy = missing
+    if not files_to_copy:
+        manifest.close()
+        journal.close()
+        catalog.close()
+        print(f"✅ El backup del año {year_selected} ya está al día.")
+        return True
+
     print("⏳ Copiando y organizando...")
     print()
 
-    # Función para mostrar barra de progreso
-    def show_progress_bar(completed, total, width=50):
-        percent = completed / total
-        filled = int(width * percent)
-        bar = "█" * filled + "░" * (width - filled)
-        percentage = f"{percent:.1%}"
-        return f"[{bar}] {percentage} ({completed}/{total})"
-
     total_files = len(files_to_copy)
     copied_files = {}
     
     # Contar archivos por mes para estadísticas
     month_stats = {}
     
-    # Copiar archivos con barra de progreso
-    for i, filename in enumerate(files_to_copy, 1):
-        # Extraer información de fecha
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        date_str = match.group(1)
+    # Preparar destino de cada archivo
+    jobs = []
+    entry_of = {}
+    names = NameAllocator()
+    # Las rutas de la copia interrumpida siguen siendo suyas aunque aún no existan
+    for _, _, local_path in resumed.values():
+        names.reserve(local_path)
+    for entry, date_str in files_to_copy:
+        filename = entry.name
         
         # Crear estructura de carpetas
-        month_number = int(date_str[4:6])
-        month_name = MESES_ES[month_number]
-        month_folder = f"{month_number:02d}-{month_name}"
+        destination_folder = month_folder_path(base_dir, date_str)
+        month_folder = destination_folder.name
+        destination_folder.mkdir(parents=True, exist_ok=True)
+
+        # Con varios años, el resumen distingue AÑO/MM-Mes
+        if first_year != last_year:
+            month_folder = f"{date_str[:4]}/{month_folder}"
         
         # Actualizar estadísticas
         if month_folder not in month_stats:
             month_stats[month_folder] = 0
         month_stats[month_folder] += 1
         
-        destination_folder = base_dir / year_selected / month_folder
-        destination_folder.mkdir(parents=True, exist_ok=True)
-        
-        # Ruta destino final
-        local_path = destination_folder / filename
-        
-        # Evitar sobrescrituras
-        if local_path.exists():
-            base_name = Path(filename).stem
-            ext = Path(filename).suffix
-            counter = 1
-            while local_path.exists():
-                new_name = f"{base_name}_{counter}{ext}"
-                local_path = destination_folder / new_name
-                counter += 1
-        
-        # Copiar archivo desde el dispositivo
-        remote_path = f"{remote_dir}/{filename}"
-        pull_result = pull_file_from_device(remote_path, local_path)
+        # Ruta destino final, sin sobrescribir (también entre archivos de subcarpetas
+        # distintas con el mismo nombre); al reanudar, la misma que se le dio la otra vez
+        previous = resumed.get(entry.path)
+        if previous and previous[:2] == (entry.size, entry.mtime):
+            local_path = previous[2]
+        else:
+            local_path = names.allocate(destination_folder, filename)
         
-        if "Error" in pull_result:
-            print(f"\r⚠️ Error copiando {filename}")
-            # Mostrar barra de progreso actualizada
-            print(f"\r{show_progress_bar(i, total_files)}", end="")
+        jobs.append((entry.path, local_path))
+        entry_of[entry.path] = (entry, month_folder)
+
+    # Apuntar en el diario qué va a dónde antes de descargar nada
+    journal.plan([
+        (remote_path, entry_of[remote_path][0].size, entry_of[remote_path][0].mtime, local_path)
+        for remote_path, local_path in jobs
+    ])
+
+    # Copiar por lotes (un `adb pull` por grupo de archivos del mismo mes), varios lotes
+    # a la vez, con una barra de progreso común. Cada lote llega a una carpeta temporal
+    # y de ahí se renombra a su sitio, así que en destino nunca queda un archivo a medias
+    sizes = {entry.path: entry.size for entry, _ in entry_of.values()}
+    progress = (progress_factory or ProgressDisplay)(total_files, sum(sizes.values()))
+
+    if thumbnails is None:
+        thumbnails = GENERATE_THUMBNAILS
+    builder = ThumbnailBuilder() if thumbnails and thumbnails_ready() else None
+
+    def on_result(remote_path, local_path, error, nbytes):
+        entry, month_folder = entry_of[remote_path]
+        if error:
+            progress.message(f"⚠️ Error copiando {entry.name}")
         else:
+            # Las miniaturas se hacen en otros procesos mientras siguen llegando archivos
+            if builder:
+                builder.submit(local_path)
             # Guardar archivo copiado para resumen
             if month_folder not in copied_files:
                 copied_files[month_folder] = []
-            copied_files[month_folder].append(filename)
-            
-            # Mostrar barra de progreso
-            print(f"\r{show_progress_bar(i, total_files)}", end="")
-
-    # Línea en blanco después de la barra de progreso
-    print("\n")
+            copied_files[month_folder].append(entry.name)
+            # Apuntarlo en el manifiesto para no volver a descargarlo
+            manifest.record(entry.path, entry.size, entry.mtime, local_path)
+            journal.finish(entry.path)
+            catalog.add(local_path, "camera", dates[entry.path])
+            new_files.append(local_path)
+            pulled.append((entry.path, local_path))
+        progress.update(nbytes=nbytes)
+
+    new_files = []
+    pulled = []
+    # Pase lo que pase (Ctrl+C, un error de adb o de la verificación), el pool de miniaturas se cierra
+    try:
+        try:
+            pull_files(ADB_PATH, jobs, on_result=on_result, sizes=sizes, serial=current_serial())
+        except KeyboardInterrupt:
+            progress.finish()
+            print("\n⏸️ Copia interrumpida. Vuelve a elegir esta opción para continuar donde se quedó.")
+            return False
+        finally:
+            manifest.close()
+            journal.close()
+            catalog.close()
+
+        # Línea en blanco después de la barra de progreso
+        progress.finish()
+        if verify is None:
+            verify = VERIFY_TRANSFERS
+        corrupted = []
+        if verify and pulled:
+            remote_stats = {entry.path: (entry.size, entry.mtime) for entry, _ in entry_of.values()}
+            corrupted = repair_pulls(base_dir, pulled, sizes, remote_stats)
+        link_new_duplicates(new_files)
+        if builder:
+            finish_thumbnails(builder, {path.parent for path in new_files})
+    finally:
+        if builder:
+            builder.close()
+    total_copied = sum(len(files) for files in copied_files.values()) - len(corrupted)
+    if progress_factory:
+        return total_copied == total_files
+    print()
     
     # Mostrar resumen detallado
     print("📊 RESUMEN DE COPIA:")
     print("-" * 50)
     
-    total_copied = sum(len(files) for files in copied_files.values())
-    
     for month_folder, file_list in sorted(copied_files.items()):
         print(f"📁 {month_folder}: {len(file_list)} archivos")
     
@@ -305,121 +633,170 @@ def copy_and_organize_media():
     if total_copied < total_files:
         print(f"⚠️  {total_files - total_copied} archivos no se pudieron copiar")
     
-    print(f"📁 Archivos organizados en: '{LOCAL_BACKUP_DIR}/{year_selected}/'")
+    if first_year == last_year:
+        print(f"📁 Archivos organizados en: '{base_dir.as_posix()}/{year_selected}/'")
+    else:
+        print(f"📁 Archivos organizados en: '{base_dir.as_posix()}/{first_year}/' a '{base_dir.as_posix()}/{last_year}/'")
+    return total_copied == total_files
 
-def extract_media_from_specific_month():
-    if not check_device():
+@timed()
+def verify_copies(pairs, remote_stats=None):
+    """Compara con MD5 cada (ruta_remota, ruta_local); devuelve los que no coinciden, o None si no se pudo"""
+    print(f"🔎 Verificando {len(pairs)} archivos con MD5...")
+    try:
+        return verify_pairs(ADB_PATH, pairs, current_serial(), remote_stats)
+    except Exception as e:
+        print(f"⚠️ No se pudo verificar: {e}")
+        return None
+
+def repair_pulls(base_dir, pulled, sizes, remote_stats):
+    """Verifica lo descargado y repite una vez lo que no coincide con el móvil.
+
+    Lo que sigue sin coincidir se borra y sale del manifiesto, así que la
+    próxima copia lo vuelve a descargar. Devuelve esa lista de (ruta_remota, ruta_local).
+    """
+    mismatched = verify_copies(pulled, remote_stats)
+    if not mismatched:
+        if mismatched is not None:
+            print("✅ Todo lo copiado coincide con el móvil.")
+        return []
+    print(f"🔁 {len(mismatched)} archivos no coinciden con el móvil; se vuelven a descargar...")
+    pull_files(ADB_PATH, mismatched, sizes=sizes, serial=current_serial())
+    corrupted = verify_copies(mismatched, remote_stats)
+    if corrupted is None:
+        return []
+    if not corrupted:
+        print("✅ Descargados de nuevo; ahora todo coincide con el móvil.")
+    forget_copies(base_dir, corrupted)
+    return corrupted
+
+def forget_copies(base_dir, pairs):
+    """Borra las copias locales dañadas y las quita del manifiesto para volver a copiarlas"""
+    with BackupManifest(base_dir) as manifest, MediaCatalog() as catalog:
+        for remote_path, local_path in pairs:
+            manifest.forget(remote_path)
+            catalog.remove(local_path)
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+            print(f"⚠️ {Path(local_path).name} no coincide con el móvil; se copiará de nuevo la próxima vez.")
+
+def verify_backup(base_dir=None):
+    """Comprueba con MD5 todo el backup AÑO/MES contra la SD; True si todo coincide"""
+    base_dir = Path(base_dir or LOCAL_BACKUP_DIR)
+    if not (base_dir / MANIFEST_NAME).exists():
+        print(f"❌ No hay ningún backup en '{base_dir}'.")
+        return False
+    remote_dir = camera_dir_ready()
+    if not remote_dir:
+        return False
+
+    print(f"📋 Escaneando archivos en {remote_dir}...")
+    remote = {entry.path: entry for entry in index_files_on_device(remote_dir)}
+    with BackupManifest(base_dir) as manifest:
+        entries = manifest.entries()
+    # Solo se puede comparar lo que sigue igual en el móvil (mismo tamaño y fecha)
+    pairs = []
+    remote_stats = {}
+    packed = 0
+    for remote_path, size, mtime, local_path in entries:
+        if not local_path.exists() and packed_size(local_path) == size:
+            # Ya empaquetado: el paquete se comprueba al restaurarlo
+            packed += 1
+            continue
+        entry = remote.get(remote_path)
+        if entry and (entry.size, entry.mtime) == (size, mtime):
+            pairs.append((remote_path, local_path))
+            remote_stats[remote_path] = (size, mtime)
+    if packed:
+        print(f"⏭️ {packed} archivos están empaquetados, se omiten.")
+    if len(pairs) + packed < len(entries):
+        print(f"⏭️ {len(entries) - len(pairs) - packed} archivos ya no están (o han cambiado) en la SD, se omiten.")
+
+    mismatched = verify_copies(pairs, remote_stats)
+    if mismatched is None:
+        return False
+    if mismatched:
+        forget_copies(base_dir, mismatched)
+        print(f"⚠️ {len(mismatched)} de {len(pairs)} archivos no coinciden. Repite la copia del año para recuperarlos.")
+        return False
+    print(f"✅ Los {len(pairs)} archivos del backup coinciden con la SD.")
+    return True
+
+def thumbnails_ready():
+    if thumbnails_available():
+        return True
+    print("⚠️ Para generar miniaturas hace falta Pillow (pip install pillow); se omiten.")
+    return False
+
+@timed()
+def finish_thumbnails(builder, folders):
+    """Espera a las miniaturas de esas carpetas y dibuja su hoja de contactos"""
+    print(f"🖼️ Terminando miniaturas de {len(folders)} carpetas...")
+    try:
+        created, sheets = builder.finish(sorted(folders))
+    except Exception as e:
+        # Las miniaturas son un extra: un fallo aquí no estropea el backup
+        print(f"⚠️ Error generando miniaturas: {e}")
         return
+    print(f"🖼️ {created} miniaturas nuevas, {sheets} hojas de contactos ('{CONTACT_SHEET_NAME}.jpg').")
+
+def generate_thumbnails(base_dir=None):
+    """Miniaturas y hojas de contactos de todas las carpetas AÑO/MM-Mes del backup (sin móvil)"""
+    base_dir = Path(base_dir or LOCAL_BACKUP_DIR)
+    folders = [month for year in base_dir.glob("[0-9][0-9][0-9][0-9]") if year.is_dir()
+               for month in year.iterdir() if month.is_dir() and not month.name.startswith(".")]
+    if not folders:
+        print(f"❌ No hay carpetas de meses en '{base_dir}'.")
+        return False
+    if not thumbnails_ready():
+        return False
+    finish_thumbnails(ThumbnailBuilder(), folders)
+    return True
 
-    remote_dir = detect_sdcard_path()
+def extract_media_from_specific_month():
+    remote_dir = camera_dir_ready()
     if not remote_dir:
-        print("❌ No se encontró la carpeta DCIM/Camera en la SD externa.")
         return
 
-    year = input("📅 Introduce el AÑO (YYYY): ").strip()
-    month = input("📅 Introduce el MES (MM): ").strip()
-
-    if not (year.isdigit() and month.isdigit() and 1 <= int(month) <= 12):
-        print("❌ Año o mes inválidos.")
+    year_month = ask_year_month()
+    if not year_month:
         return
+    year, month = year_month
 
-    month = month.zfill(2)
     folder_name = f"{year}-{month}"
-    local_dir = Path(folder_name)
-    local_dir.mkdir(parents=True, exist_ok=True)
-
-    files = list_files_on_device(remote_dir)
-    if not files:
-        print("❌ No hay archivos en la carpeta remota.")
+    result = extract_media_in_range(remote_dir, *month_range(year, month), folder_name)
+    if result is None:
         return
-
-    total = 0
-    for filename in files:
-        if not any(filename.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
-            continue
-
-        # Detectar fechas universalmente
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        if not match:
-            continue
-
-        date_str = match.group(1)
-        f_year = date_str[:4]
-        f_month = date_str[4:6]
-
-        if f_year == year and f_month == month:
-            remote_path = f"{remote_dir}/{filename}"
-            local_path = local_dir / filename
-            pull_result = pull_file_from_device(remote_path, local_path)
-
-            if "Error" in pull_result:
-                print(f"⚠️ Error extrayendo {filename}: {pull_result}")
-                continue
-
-            total += 1
-            print(f"✅ {filename} copiado.")
+    total, _ = result
 
     print(f"\n🎉 Proceso completado. {total} archivos copiados a '{folder_name}'.")
 
 def extract_media_from_specific_month_preserve_metadata():
-    if not check_device():
-        return
-
-    remote_dir = detect_sdcard_path()
+    remote_dir = camera_dir_ready()
     if not remote_dir:
-        print("❌ No se encontró la carpeta DCIM/Camera en la SD externa.")
         return
 
-    year = input("📅 Introduce el AÑO (YYYY): ").strip()
-    month = input("📅 Introduce el MES (MM): ").strip()
-
-    if not (year.isdigit() and month.isdigit() and 1 <= int(month) <= 12):
-        print("❌ Año o mes inválidos.")
+    year_month = ask_year_month()
+    if not year_month:
         return
+    year, month = year_month
 
-    month = month.zfill(2)
     folder_name = f"{year}-{month}_METADATA_OK"
-    local_dir = Path(folder_name)
-    local_dir.mkdir(parents=True, exist_ok=True)
-
-    files = list_files_on_device(remote_dir)
-    if not files:
-        print("❌ No hay archivos en la carpeta remota.")
+    # 👇 CLAVE: -a preserva fecha y hora originales
+    result = extract_media_in_range(
+        remote_dir, *month_range(year, month), folder_name, preserve_metadata=True
+    )
+    if result is None:
         return
-
-    total = 0
-    for filename in files:
-        if not any(filename.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
-            continue
-
-        match = re.search(FILENAME_DATE_REGEX, filename)
-        if not match:
-            continue
-
-        date_str = match.group(1)
-        f_year = date_str[:4]
-        f_month = date_str[4:6]
-
-        if f_year == year and f_month == month:
-            remote_path = f"{remote_dir}/{filename}"
-            local_path = local_dir / filename
-
-            # 👇 CLAVE: -a preserva fecha y hora originales
-            cmd = [str(ADB_PATH), "pull", "-a", remote_path, str(local_path)]
-            result = run_command_list(cmd)
-
-            if "Error" in result:
-                print(f"⚠️ Error extrayendo {filename}: {result}")
-                continue
-
-            total += 1
-            print(f"✅ {filename} copiado (metadatos conservados).")
+    total, _ = result
 
     print(f"\n🎉 Proceso completado.")
     print(f"📁 {total} archivos copiados a '{folder_name}' manteniendo fecha y hora originales.")
 
 def restore_media_to_device():
-    if not check_device():
+    if not device_ready():
         return
 
     # Detectar automáticamente la SD donde está DCIM/Camera
@@ -435,35 +812,476 @@ def restore_media_to_device():
     local_folder = input("📂 Introduce la carpeta local a restaurar: ").strip()
     local_path = Path(local_folder).expanduser().resolve()
 
-    if not local_path.exists() or not local_path.is_dir():
+    if not local_path.is_dir() and not is_pack(local_path) and not is_pack(pack_path(local_path)):
         print(f"❌ La carpeta no existe:\n{local_path}")
         return
 
+    restore_folder(target_path, local_path)
+
+@timed()
+def restore_folder(target_path, local_path, verify=None):
+    """Sube local_path a target_path en el móvil; True si todo llegó completo.
+
+    Los meses empaquetados (MM-Mes.tar) que haya dentro, o el de la propia
+    carpeta, se suben directamente desde el paquete. Con verify (por defecto
+    VERIFY_TRANSFERS) lo subido se comprueba con MD5 y lo que no coincide se
+    sube una segunda vez.
+    """
+    # Un paquete se restaura como la carpeta de mes que era
+    if local_path.suffix == PACK_SUFFIX:
+        local_path = local_path.with_suffix("")
+    packs = {}
+    if is_pack(pack_path(local_path)):
+        packs[pack_path(local_path)] = target_path
+
+    # Archivos a restaurar: todo lo que haya en la carpeta, recorriéndola con os.scandir
+    # (los ocultos, como manifiestos, índices o miniaturas, no se suben)
+    jobs = []
+    files = iter_files(local_path) if local_path.is_dir() else []
+    for file, _ in sorted(files):
+        file = Path(file)
+        # Los meses empaquetados van aparte
+        if file.suffix == PACK_SUFFIX and is_pack(file):
+            relative_dir = file.with_suffix("").relative_to(local_path).as_posix()
+            packs.setdefault(file, f"{target_path}/{relative_dir}")
+            continue
+        # Construir ruta destino en SD
+        relative_path = file.relative_to(local_path)
+        remote_path = f"{target_path}/{relative_path}".replace("\\", "/")
+        jobs.append((file, remote_path))
+
+    ok = restore_files(target_path, jobs, verify) if jobs or not packs else True
+    for pack, remote_dir in sorted(packs.items()):
+        ok = restore_pack(remote_dir, pack, verify) and ok
+    return ok
+
+def restore_files(target_path, jobs, verify=None):
+    """Sube los (ruta_local, ruta_remota) que no estén ya en el móvil; True si todo llegó completo"""
+    # Lo que ya está en el móvil con el mismo tamaño y fecha no se vuelve a subir
+    # (un único listado remoto con tamaños y fechas)
+    print("📋 Comprobando qué hay ya en la SD...")
+    remote = {entry.path: entry for entry in index_files_on_device(target_path)}
+    pending = []
+    for file, remote_path in jobs:
+        entry = remote.get(remote_path)
+        st = file.stat()
+        if entry and entry.size == st.st_size and abs(entry.mtime - st.st_mtime) <= MTIME_TOLERANCE:
+            continue
+        pending.append((file, remote_path))
+    if len(pending) < len(jobs):
+        print(f"⏭️ {len(jobs) - len(pending)} archivos ya estaban en la SD, se omiten.")
+    if not pending:
+        print("\n🎉 Restauración completada. La SD ya estaba al día.")
+        return True
+
+    # Crear de una vez todas las carpetas remotas necesarias
+    create_remote_dirs({remote_path.rsplit("/", 1)[0] for _, remote_path in pending})
+
     print("⏳ Copiando archivos a la SD (manteniendo fecha y hora)...")
 
-    # Recorrer todos los archivos de la carpeta local
+    # Subir por lotes manteniendo fecha/hora (-a), varios lotes a la vez
     total = 0
-    for file in local_path.rglob("*"):
-        if file.is_file():
-            # Construir ruta destino en SD
-            relative_path = file.relative_to(local_path)
-            remote_path = f"{target_path}/{relative_path}".replace("\\", "/")
-
-            # Crear carpeta remota si no existe
-            dir_remote = os.path.dirname(remote_path)
-            run_command_list([str(ADB_PATH), "shell", "mkdir", "-p", dir_remote])
-
-            # Subir el archivo manteniendo fecha/hora (-a)
-            result = push_file_to_device(str(file), remote_path)
-            if "error" in result.lower():
-                print(f"⚠️ Error subiendo {file.name}: {result}")
-            else:
-                print(f"✅ {file.name} restaurado.")
-                total += 1
+    progress = ProgressDisplay(len(pending), sum(file.stat().st_size for file, _ in pending))
+
+    def on_result(file, remote_path, error, nbytes):
+        nonlocal total
+        if error:
+            progress.message(f"⚠️ Error subiendo {file.name}: {error}")
+        else:
+            total += 1
+        progress.update(nbytes=nbytes)
+
+    results = push_files(ADB_PATH, pending, on_result=on_result, serial=current_serial())
+    progress.finish()
+
+    # Verificación: un nuevo listado remoto y comparar tamaños
+    remote = {entry.path: entry.size for entry in index_files_on_device(target_path, reuse=False)}
+    sent = []
+    for file, remote_path, error in results:
+        if error:
+            continue
+        if remote.get(remote_path) != file.stat().st_size:
+            print(f"⚠️ {file.name} no llegó completo a la SD.")
+            total -= 1
+        else:
+            sent.append((remote_path, file))
+
+    if verify is None:
+        verify = VERIFY_TRANSFERS
+    if verify and sent:
+        mismatched = verify_copies(sent)
+        if mismatched:
+            print(f"🔁 {len(mismatched)} archivos no coinciden con la copia local; se vuelven a subir...")
+            push_files(ADB_PATH, [(file, remote_path) for remote_path, file in mismatched],
+                       serial=current_serial())
+            for remote_path, file in verify_copies(mismatched) or []:
+                print(f"⚠️ {file.name} sigue sin coincidir en la SD.")
+                total -= 1
+        elif mismatched is not None:
+            print("✅ Todo lo subido coincide con la copia local.")
 
     print(f"\n🎉 Restauración completada. {total} archivos subidos a la SD.")
+    return total == len(pending)
+
+@timed()
+def restore_pack(target_path, pack, verify=None):
+    """Sube al móvil un mes empaquetado sin desempaquetarlo; True si todo llegó completo.
+
+    Lo que falta en el móvil sale del paquete tal cual (sus bloques del tar, con
+    cabecera y fecha) en un único flujo `adb exec-in tar -x`. Lo que no llegue
+    entero, o no coincida con MD5 si se pide verify, se saca a una carpeta
+    temporal y se sube con `adb push`.
+    """
+    members = read_index(pack)
+    print(f"📦 Restaurando el paquete '{pack.name}' → {target_path}")
+    remote = {entry.path: entry for entry in index_files_on_device(target_path)}
+    pending = []
+    for name, (_, _, size, mtime_ns) in sorted(members.items()):
+        entry = remote.get(f"{target_path}/{name}")
+        if entry and entry.size == size and abs(entry.mtime - mtime_ns / 1e9) <= MTIME_TOLERANCE:
+            continue
+        pending.append(name)
+    if len(pending) < len(members):
+        print(f"⏭️ {len(members) - len(pending)} archivos ya estaban en la SD, se omiten.")
+    if not pending:
+        print("🎉 El paquete ya estaba en la SD.")
+        return True
+
+    if verify is None:
+        verify = VERIFY_TRANSFERS
+
+    def failed(names):
+        """Los de names que no están enteros en el móvil (ni coinciden con MD5, si se pide)"""
+        sizes = {entry.path: entry.size for entry in index_files_on_device(target_path, reuse=False)}
+        wrong = [name for name in names if sizes.get(f"{target_path}/{name}") != members[name][2]]
+        if verify:
+            complete = [name for name in names if name not in wrong]
+            try:
+                hashes = remote_md5(ADB_PATH, current_serial(), [f"{target_path}/{name}" for name in complete])
+                wrong += [name for name in complete
+                          if hashes.get(f"{target_path}/{name}") != member_md5(pack, name)]
+            except OSError as e:
+                print(f"⚠️ No se pudo verificar: {e}")
+        return wrong
+
+    print(f"⏳ Subiendo {len(pending)} archivos desde el paquete...")
+    progress = ProgressDisplay(len(pending), sum(members[name][2] for name in pending))
+    start = time.perf_counter()
+    try:
+        push_tar_stream(ADB_PATH, target_path,
+                        iter_raw_tar(pack, pending, lambda name, size: progress.update(nbytes=size)),
+                        current_serial())
+    except OSError as e:
+        progress.message(f"⚠️ Sin flujo tar ({e}); se usa adb push.")
+    progress.finish()
+    retry = failed(pending)
+    streamed = [name for name in pending if name not in retry]
+    stats.transfer("push", len(streamed), sum(members[name][2] for name in streamed),
+                   time.perf_counter() - start)
+
+    if retry:
+        print(f"🔁 {len(retry)} archivos no llegaron bien; se sacan del paquete y se suben con adb push...")
+        staging = pack.parent / f".restaurar-{pack.stem}"
+        staging.mkdir(exist_ok=True)
+        try:
+            for name in retry:
+                extract_member(pack, name, staging / name)
+            create_remote_dirs({target_path})
+            push_files(ADB_PATH, [(staging / name, f"{target_path}/{name}") for name in retry],
+                       serial=current_serial())
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        retry = failed(retry)
+        for name in retry:
+            print(f"⚠️ {name} no llegó bien a la SD.")
+    elif verify:
+        print("✅ Todo lo subido coincide con el paquete.")
+
+    print(f"🎉 {len(pending) - len(retry)} archivos subidos desde '{pack.name}'.")
+    return not retry
+
+def closed_month_folders(after_months=None):
+    """Carpetas AÑO/MM-Mes (cámara, cada móvil y WhatsApp) de hace al menos after_months meses"""
+    after_months = PACK_AFTER_MONTHS if after_months is None else after_months
+    now = datetime.now()
+    # El mes en curso nunca está cerrado
+    last = now.year * 12 + now.month - 1 - max(after_months, 1)
+    bases = [Path(LOCAL_BACKUP_DIR), Path(LOCAL_WA_DIR), *Path(DEVICES_DIR).glob(f"*/{LOCAL_BACKUP_DIR}")]
+    folders = []
+    for base in bases:
+        for year in base.glob("[0-9][0-9][0-9][0-9]"):
+            for month in year.iterdir():
+                match = MONTH_FOLDER_REGEX.match(month.name)
+                if month.is_dir() and match and int(year.name) * 12 + int(match.group(1)) - 1 <= last:
+                    folders.append(month)
+    return sorted(folders)
+
+@timed()
+def pack_old_months(apply=None, after_months=None):
+    """Empaqueta cada mes cerrado de los backups en un único AÑO/MM-Mes.tar con su índice (sin móvil).
+
+    Cada archivo se puede volver a leer del paquete sin desempaquetarlo, y los
+    backups, la sincronización de WhatsApp y la restauración lo siguen viendo.
+    apply=None pregunta antes de empaquetar; False solo muestra el plan.
+    Devuelve True si no falló nada.
+    """
+    plan = []
+    for folder in closed_month_folders(after_months):
+        with os.scandir(folder) as entries:
+            sizes = [item.stat().st_size for item in entries
+                     if not item.name.startswith(".") and item.is_file(follow_symlinks=False)]
+        if sizes:
+            plan.append((folder, len(sizes), sum(sizes)))
+    if not plan:
+        print("✅ No hay meses cerrados con archivos sueltos que empaquetar.")
+        return True
+
+    print("📋 PLAN DE EMPAQUETADO:")
+    print("-" * 50)
+    for folder, count, nbytes in plan:
+        print(f"📦 {folder.as_posix()}: {count} archivos ({format_bytes(nbytes)})")
+    print("-" * 50)
+    print(f"📦 {sum(count for _, count, _ in plan)} archivos en {len(plan)} meses.")
+
+    if apply is None:
+        answer = input("¿Empaquetar ahora? (s = empaquetar, cualquier otra tecla = solo ver el plan): ")
+        apply = answer.strip().lower() == "s"
+    if not apply:
+        print("👀 Simulación: no se ha empaquetado nada.")
+        return True
+
+    total = 0
+    ok = True
+    with MediaCatalog() as catalog:
+        for folder, _, _ in plan:
+            try:
+                packed = pack_folder(folder)
+            except (OSError, tarfile.TarError) as e:
+                print(f"⚠️ Error empaquetando {folder}: {e}")
+                ok = False
+                continue
+            pack = pack_path(folder)
+            for path, name in packed:
+                catalog.rename(path, pack / name)
+            # Si un nombre ya estaba en el paquete, el archivo entra como nombre_N: el manifiesto
+            # del backup (AÑO/MM-Mes → su carpeta base) tiene que apuntar al nuevo nombre
+            renamed = [(path, name) for path, name in packed if path.name != name]
+            if renamed and (folder.parent.parent / MANIFEST_NAME).exists():
+                members = read_index(pack)
+                with BackupManifest(folder.parent.parent) as manifest:
+                    for path, name in renamed:
+                        manifest.relocate(path, folder / name, members[name][2])
+            total += len(packed)
+            print(f"📦 {pack.as_posix()}: {len(packed)} archivos")
+    print(f"🎉 {total} archivos empaquetados.")
+    return ok
+
+def move_file(source, destination):
+    """Mueve con un simple rename si es el mismo disco; si no, copia y borra el original"""
+    try:
+        os.rename(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(source, destination)
+        os.remove(source)
+
+@timed()
+def plan_camera_reorganization(base_dir):
+    """Recorre una sola vez las carpetas YYYY-MM-DD / YYYY-MM(_METADATA_OK) y decide a dónde va cada archivo.
+
+    Devuelve (movimientos [(origen, destino)], archivos que ya estaban en el backup,
+    carpetas de origen).
+    """
+    regex = re.compile(FILENAME_DATE_REGEX)
+    media = {ext.lower() for ext in MEDIA_EXTENSIONS}
+    names = NameAllocator()
+    moves = []
+    already = 0
+    sources = []
+    with os.scandir(".") as entries:
+        folders = sorted((item for item in entries
+                          if item.is_dir() and LOCAL_FOLDER_REGEX.match(item.name)),
+                         key=lambda item: item.name)
+    planned = set()
+    existing = {}
+    for folder in folders:
+        folder_year, folder_month, _ = LOCAL_FOLDER_REGEX.match(folder.name).groups()
+        if not 1 <= int(folder_month) <= 12:
+            continue
+        sources.append(Path(folder.path))
+        for path, st in iter_files(folder.path):
+            name = os.path.basename(path)
+            if os.path.splitext(name)[1].lower() not in media:
+                continue
+            # Fecha del nombre o, si no la lleva, la de la carpeta en la que se copió
+            match = regex.search(name)
+            year, month = (match.group(1)[:4], match.group(1)[4:6]) if match else (folder_year, folder_month)
+            destination = month_folder_path(base_dir, f"{year}{month}01")
+
+            # La misma foto ya copiada con la opción 3 (suelta o ya empaquetada en su mes, o en
+            # otra de estas carpetas): se deja donde está
+            if destination not in existing:
+                existing[destination] = existing_copies(destination)
+            key = (destination, name, st.st_size)
+            if key in planned or (name, st.st_size) in existing[destination]:
+                already += 1
+                continue
+            planned.add(key)
+            moves.append((Path(path), names.allocate(destination, name)))
+    return moves, already, sources
+
+def reorganize_camera_backups(apply=None):
+    """Pasa las copias de las opciones 4-7 a la estructura AÑO/MM-Mes del backup sin usar el móvil.
+
+    apply=None pregunta antes de mover; False solo muestra el plan. Devuelve True si no falló nada.
+    """
+    base_dir = Path(LOCAL_BACKUP_DIR)
+    moves, already, sources = plan_camera_reorganization(base_dir)
+    if not sources:
+        print("❌ No hay carpetas YYYY-MM-DD ni YYYY-MM que reorganizar.")
+        return True
+    if already:
+        print(f"⏭️ {already} archivos ya estaban en '{LOCAL_BACKUP_DIR}', se dejan donde están.")
+    if not moves:
+        print("✅ No hay nada que mover.")
+        return True
+
+    month_stats = {}
+    for _, destination in moves:
+        folder = destination.parent.relative_to(base_dir).as_posix()
+        month_stats[folder] = month_stats.get(folder, 0) + 1
+    print("📋 PLAN DE REORGANIZACIÓN:")
+    print("-" * 50)
+    for folder, count in sorted(month_stats.items()):
+        print(f"📁 {folder}: {count} archivos")
+    print("-" * 50)
+    print(f"📦 {len(moves)} archivos desde {len(sources)} carpetas.")
+
+    if apply is None:
+        answer = input("¿Mover ahora? (s = mover, cualquier otra tecla = solo ver el plan): ")
+        apply = answer.strip().lower() == "s"
+    if not apply:
+        print("👀 Simulación: no se ha movido nada.")
+        return True
+
+    total = 0
+    created = set()
+    with MediaCatalog() as catalog:
+        for source, destination in moves:
+            if destination.parent not in created:
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                created.add(destination.parent)
+            try:
+                move_file(source, destination)
+                total += 1
+            except OSError as e:
+                print(f"⚠️ Error moviendo {source}: {e}")
+                continue
+            if not catalog.move(source, destination):
+                catalog.add(destination, "camera", local_capture_date(destination))
+
+    # Las carpetas que se han quedado vacías sobran
+    for folder in sources:
+        for current, _, _ in sorted(os.walk(folder), reverse=True):
+            try:
+                os.rmdir(current)
+            except OSError:
+                pass
+
+    print(f"🎉 {total} archivos reorganizados en '{LOCAL_BACKUP_DIR}/'.")
+    return total == len(moves)
+
+@timed()
+def deduplicate_backups():
+    """Sustituye por enlaces duros las copias idénticas entre el backup de cámara y el de WhatsApp"""
+    roots = [Path(LOCAL_BACKUP_DIR), Path(LOCAL_WA_DIR)]
+    if not any(root.exists() for root in roots):
+        print("❌ No hay carpetas de backup que revisar.")
+        return
+    print("🔍 Buscando duplicados (primero por tamaño, luego por contenido)...")
+    # Si el catálogo conoce ambas carpetas enteras, no hace falta recorrerlas
+    paths = []
+    with MediaCatalog() as catalog:
+        for root in roots:
+            if root.exists():
+                cataloged = catalog.files_under(root)
+                if cataloged is None:
+                    paths = None
+                    break
+                paths.extend(cataloged)
+    linked, saved = deduplicate(roots, paths=paths)
+    print(f"🎉 {linked} duplicados enlazados, {format_bytes(saved)} liberados.")
+
+def local_capture_date(path):
+    """Fecha YYYYMMDD de una copia local: la del nombre (cámara o WhatsApp) o la de sus metadatos"""
+    match = re.search(FILENAME_DATE_REGEX, Path(path).name)
+    if match:
+        return match.group(1)
+    return whatsapp_local_date(path)
+
+def catalog_roots():
+    """Carpetas que recoge el catálogo, con su origen: backups de cámara, copias de día/mes y WhatsApp"""
+    roots = [(LOCAL_BACKUP_DIR, "camera"), (DEVICES_DIR, "camera"), (LOCAL_WA_DIR, "whatsapp")]
+    with os.scandir(".") as entries:
+        roots.extend((item.name, "camera") for item in entries
+                     if item.is_dir() and LOCAL_FOLDER_REGEX.match(item.name))
+    return roots
+
+@timed()
+def refresh_catalog():
+    """Pone al día el catálogo con lo que hay en disco (solo se leen los archivos nuevos o cambiados)"""
+    print("🗂️ Actualizando el catálogo de fotos y vídeos...")
+    with MediaCatalog() as catalog:
+        added, removed = catalog.refresh(catalog_roots(), local_capture_date, MEDIA_EXTENSIONS)
+    print(f"✅ Catálogo al día: {added} archivos nuevos o cambiados, {removed} ya no estaban.")
+    return True
+
+@timed()
+def query_catalog(start=None, end=None, source=None, folder=None, count=False):
+    """Muestra lo que hay en el PC de esas fechas (YYYYMMDD), origen y carpeta, sin tocar el disco.
+
+    Con count solo se muestra cuántos archivos hay de cada mes. Devuelve cuántos cumplen el filtro.
+    """
+    with MediaCatalog() as catalog:
+        rows = catalog.query(start, end, source, folder)
+    if not rows:
+        print("❌ No hay nada en el catálogo con esos filtros "
+              "(si es la primera vez, créalo con la opción de actualizar el catálogo).")
+        return 0
+    if count:
+        months = {}
+        for _, _, date_str, size, _ in rows:
+            month = f"{date_str[:4]}-{date_str[4:6]}" if date_str else "sin fecha"
+            files, nbytes = months.get(month, (0, 0))
+            months[month] = (files + 1, nbytes + size)
+        for month, (files, nbytes) in sorted(months.items()):
+            print(f"📁 {month}: {files} archivos ({format_bytes(nbytes)})")
+    else:
+        for path, row_source, date_str, size, _ in rows:
+            try:
+                path = os.path.relpath(path)
+            except ValueError:
+                # Otra unidad en Windows: se deja la ruta completa
+                pass
+            print(f"{date_str or '--------'}  {row_source:<8} {format_bytes(size):>10}  {path}")
+    print(f"📊 {len(rows)} archivos, {format_bytes(sum(row[3] for row in rows))}.")
+    return len(rows)
+
+@timed()
+def link_new_duplicates(paths):
+    """Enlaza con el original los archivos recién descargados que ya estaban en algún backup"""
+    if not paths:
+        return
+    # Con varios móviles a la vez, el índice se usa de uno en uno
+    with _dedup_lock, DedupIndex() as index:
+        linked, saved = index.link_duplicates(paths)
+    if linked:
+        print(f"🔗 {linked} archivos ya estaban en otro backup; enlazados ({format_bytes(saved)} ahorrados).")
 
 def menu():
+    report = menu_report_path()
+    stats.reset()
     while True:
         print("\n--- MONITORIZAR MÓVIL ANDROID ---")
         print("1. Verificar dispositivo")
@@ -474,15 +1292,22 @@ def menu():
         print("6. Copiar fotos/vídeos de un MES ESPECÍFICO desde la SD")
         print("7. Copiar fotos/vídeos de un MES (CONSERVANDO FECHA/HORA)")
         print("8. Restaurar fotos/vídeos al móvil (manteniendo fechas)")
-        print("9. Salir")
+        print("9. Eliminar duplicados de los backups (cámara + WhatsApp)")
+        print("10. Reorganizar copias de fecha/mes en AÑO/MES (sin móvil)")
+        print("11. Copiar un AÑO de TODOS los móviles conectados a la vez")
+        print("12. Empaquetar los meses antiguos de los backups (sin móvil)")
+        print("13. Salir")
 
         choice = input("Selecciona una opción: ")
 
+        # Las opciones de un solo móvil preguntan cuál usar si hay varios conectados
+        if choice in DEVICE_CHOICES and not choose_device():
+            continue
+
         if choice == "1":
-            check_device()
+            check_device(refresh=True)
         elif choice == "2":
-            if check_device():
-                start_scrcpy()
+            start_scrcpy()
         elif choice == "3":
             copy_and_organize_media()
         elif choice == "4":
@@ -496,10 +1321,20 @@ def menu():
         elif choice == "8":
             restore_media_to_device()
         elif choice == "9":
+            deduplicate_backups()
+        elif choice == "10":
+            reorganize_camera_backups()
+        elif choice == "11":
+            copy_all_devices_media()
+        elif choice == "12":
+            pack_old_months()
+        elif choice == "13":
             print("👋 Saliendo...")
+            save_menu_report(report, final=True)
             break
         else:
             print("❌ Opción no válida. Intenta de nuevo.")
+        save_menu_report(report)
 
 if __name__ == "__main__":
     menu()
\ No newline at end of file
@@ -0,0 +1,199 @@
+import hashlib
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from dedup import partial_hash
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Pillow es opcional: sin él, simplemente no se generan miniaturas
+    Image = ImageOps = None
+
+# Caché de miniaturas por contenido (no por ruta): mover o renombrar una foto no obliga a rehacerla
+THUMBNAILS_DIR = ".miniaturas"
+CONTACT_SHEET_NAME = ".hoja_contactos"
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 80
+SHEET_COLUMNS = 10
+SHEET_ROWS = 50
+SHEET_CELL = 128
+# Se deja un núcleo libre para adb y la copia de archivos
+THUMBNAIL_WORKERS = max((os.cpu_count() or 2) - 1, 1)
+# Los vídeos no se decodifican: haría falta ffmpeg
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".heic"}
+
+
+def available():
+    """Indica si se pueden generar miniaturas (Pillow instalado)"""
+    return Image is not None
+
+
+def is_image(path):
+    return os.path.splitext(str(path))[1].lower() in IMAGE_EXTENSIONS
+
+
+def _cache_path(cache_dir, kind, key, ext):
+    return os.path.join(cache_dir, kind, key[:2], f"{key}{ext}")
+
+
+def _save_atomic(image, destination):
+    """Guarda como JPEG en un temporal y lo renombra: nunca queda una miniatura a medias"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    tmp = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        image.save(tmp, "JPEG", quality=THUMBNAIL_QUALITY)
+        os.replace(tmp, destination)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def _open_image(path):
+    if path.lower().endswith(".heic"):
+        try:
+            from pillow_heif import register_heif_opener
+        except ImportError:
+            return None
+        register_heif_opener()
+    return Image.open(path)
+
+
+def make_thumbnail(path, cache_dir):
+    """Miniatura de path en la caché (se ejecuta en un proceso del pool).
+
+    Devuelve (ruta de la miniatura o None, True si se ha generado ahora).
+    """
+    try:
+        key = partial_hash(path, os.path.getsize(path))
+    except OSError:
+        return None, False
+    thumb = _cache_path(cache_dir, "fotos", key, ".jpg")
+    failed = _cache_path(cache_dir, "fotos", key, ".error")
+    if os.path.exists(thumb):
+        return thumb, False
+    if os.path.exists(failed):
+        return None, False
+    try:
+        image = _open_image(path)
+        if image is None:
+            return None, False
+        with image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(THUMBNAIL_SIZE)
+            _save_atomic(image.convert("RGB"), thumb)
+        return thumb, True
+    except Exception:
+        # Archivo dañado o formato no soportado: se recuerda para no volver a intentarlo
+        os.makedirs(os.path.dirname(failed), exist_ok=True)
+        open(failed, "w").close()
+        return None, False
+
+
+def _install(source, destination):
+    """Pone en destination una copia (o enlace duro) de source, si no es ya ese archivo"""
+    try:
+        if os.path.samefile(source, destination):
+            return
+    except OSError:
+        pass
+    tmp = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, destination)
+
+
+def make_contact_sheets(folder, thumbs, cache_dir):
+    """Hojas de contactos de una carpeta a partir de sus miniaturas (ordenadas por nombre).
+
+    Cada hoja es una cuadrícula de SHEET_COLUMNS × SHEET_ROWS; se guardan en la
+    caché por el contenido de sus miniaturas y en la carpeta se dejan como
+    .hoja_contactos.jpg, .hoja_contactos-2.jpg... Devuelve cuántas se han dibujado.
+    """
+    per_sheet = SHEET_COLUMNS * SHEET_ROWS
+    pages = [thumbs[i:i + per_sheet] for i in range(0, len(thumbs), per_sheet)]
+    drawn = 0
+    for number, page in enumerate(pages, 1):
+        key = hashlib.sha1("\n".join(os.path.basename(t) for t in page).encode()).hexdigest()
+        sheet = _cache_path(cache_dir, "hojas", key, ".jpg")
+        if not os.path.exists(sheet):
+            rows = (len(page) + SHEET_COLUMNS - 1) // SHEET_COLUMNS
+            canvas = Image.new("RGB", (SHEET_COLUMNS * SHEET_CELL, rows * SHEET_CELL), "white")
+            for index, thumb in enumerate(page):
+                with Image.open(thumb) as image:
+                    image.thumbnail((SHEET_CELL, SHEET_CELL))
+                    x = index % SHEET_COLUMNS * SHEET_CELL + (SHEET_CELL - image.width) // 2
+                    y = index // SHEET_COLUMNS * SHEET_CELL + (SHEET_CELL - image.height) // 2
+                    canvas.paste(image, (x, y))
+            _save_atomic(canvas, sheet)
+            drawn += 1
+        _install(sheet, os.path.join(folder, sheet_name(number)))
+
+    # Hojas sobrantes de cuando la carpeta tenía más fotos
+    number = len(pages) + 1
+    while os.path.exists(os.path.join(folder, sheet_name(number))):
+        os.unlink(os.path.join(folder, sheet_name(number)))
+        number += 1
+    return drawn
+
+
+def sheet_name(number):
+    return f"{CONTACT_SHEET_NAME}.jpg" if number == 1 else f"{CONTACT_SHEET_NAME}-{number}.jpg"
+
+
+class ThumbnailBuilder:
+    """Genera miniaturas en procesos aparte mientras la copia sigue descargando.
+
+    `submit(ruta)` se llama según llega cada archivo y no bloquea; `finish(carpetas)`
+    completa las miniaturas de esas carpetas (las fotos que ya estaban salen de
+    la caché), dibuja sus hojas de contactos y cierra el pool.
+    """
+
+    def __init__(self, cache_dir=THUMBNAILS_DIR, workers=THUMBNAIL_WORKERS):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._futures = {}
+
+    def submit(self, path):
+        path = os.path.abspath(path)
+        if is_image(path) and path not in self._futures:
+            self._futures[path] = self._pool.submit(make_thumbnail, path, self.cache_dir)
+
+    def finish(self, folders):
+        """Devuelve (miniaturas nuevas, hojas de contactos dibujadas)"""
+        try:
+            for folder in folders:
+                with os.scandir(folder) as entries:
+                    for item in entries:
+                        if not item.name.startswith(".") and item.is_file():
+                            self.submit(item.path)
+            wait(self._futures.values())
+
+            created = 0
+            by_folder = {}
+            for path, future in sorted(self._futures.items()):
+                thumb, new = future.result()
+                created += new
+                if thumb:
+                    by_folder.setdefault(os.path.dirname(path), []).append(thumb)
+            sheets = [
+                self._pool.submit(make_contact_sheets, folder, thumbs, self.cache_dir)
+                for folder, thumbs in by_folder.items()
+            ]
+            return created, sum(future.result() for future in sheets)
+        finally:
+            self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._futures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,611 @@
+import os
+import posixpath
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from adb_shell import get_session
+from instrument import stats, timed
+
+# Límites de cada `adb pull` con varias rutas: la línea de comandos de Windows
+# admite como mucho 32767 caracteres.
+MAX_BATCH_FILES = 200
+MAX_BATCH_CMD_CHARS = 24000
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+STAGING_PREFIX = ".adb_staging-"
+
+# Planificador: transferencias simultáneas y reintentos ante fallos transitorios de adb
+TRANSFER_WORKERS = 4
+TRANSFER_RETRIES = 3
+RETRY_BACKOFF = 0.5
+TRANSIENT_ERRORS = [
+    "device offline", "no devices/emulators found", "device not found",
+    "protocol fault", "connection reset", "connection refused", "broken pipe",
+    "closed", "timeout", "timed out", "failed to connect",
+]
+
+# Transporte de las descargas: "pull" (un `adb pull` por lote) o "tar" (un único flujo
+# `adb exec-out tar` para todo; necesita el tar de toybox, Android 7 o posterior)
+TRANSPORT = "pull"
+TAR_LIST_DIR = "/data/local/tmp"
+# Rutas por comando al escribir la lista de archivos en el móvil
+TAR_LIST_CHUNK = 200
+TAR_COPY_CHUNK = 1024 * 1024
+
+# Estimación de tamaño cuando no se conoce, para mandar primero los vídeos
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".3gp"}
+ESTIMATED_VIDEO_BYTES = 100 * 1024 * 1024
+ESTIMATED_PHOTO_BYTES = 4 * 1024 * 1024
+
+
+def adb_command(adb_path, serial, *args):
+    """Línea de comandos de adb dirigida a un móvil concreto (-s) si se indica serial"""
+    cmd = [str(adb_path)]
+    if serial:
+        cmd += ["-s", serial]
+    return cmd + list(args)
+
+
+def is_transient_error(output):
+    """Indica si la salida de adb corresponde a un fallo que merece reintento"""
+    output = output.lower()
+    return "error" in output and any(marker in output for marker in TRANSIENT_ERRORS)
+
+
+def with_retries(func, retries=TRANSFER_RETRIES, backoff=RETRY_BACKOFF):
+    """Llama a func() y la repite con espera exponencial mientras devuelva un error transitorio"""
+    for attempt in range(retries + 1):
+        output = func()
+        if attempt == retries or not is_transient_error(output):
+            return output
+        time.sleep(backoff * 2 ** attempt)
+
+
+def run_parallel(tasks, worker, workers=TRANSFER_WORKERS):
+    """Ejecuta worker(tarea) en un pool de hilos acotado y devuelve los resultados por orden de llegada"""
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        return [worker(task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(worker, task) for task in tasks]
+        try:
+            return [future.result() for future in as_completed(futures)]
+        except BaseException:
+            # Ctrl-C o fallo: las tareas que aún no habían empezado ya no se lanzan
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def estimated_size(path, sizes=None):
+    if sizes and path in sizes:
+        return sizes[path]
+    if os.path.splitext(str(path))[1].lower() in VIDEO_EXTENSIONS:
+        return ESTIMATED_VIDEO_BYTES
+    return ESTIMATED_PHOTO_BYTES
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressDisplay:
+    """Barra de progreso agregada y segura entre hilos: archivos, bytes/s y tiempo restante"""
+
+    def __init__(self, total_files, total_bytes=None, width=50, stream=None):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.width = width
+        self.stream = stream or sys.stdout
+        self.completed = 0
+        self.done_bytes = 0
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def render(self):
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        percent = self.completed / self.total_files if self.total_files else 1.0
+        filled = int(self.width * percent)
+        bar = "█" * filled + "░" * (self.width - filled)
+        rate = self.done_bytes / elapsed
+        if self.total_bytes and self.done_bytes:
+            remaining = max(self.total_bytes - self.done_bytes, 0) / rate
+        elif self.completed:
+            remaining = (self.total_files - self.completed) * elapsed / self.completed
+        else:
+            remaining = 0
+        return (f"[{bar}] {percent:.1%} ({self.completed}/{self.total_files}) "
+                f"{format_bytes(rate)}/s ETA {format_duration(remaining)}")
+
+    def update(self, files=1, nbytes=0):
+        with self._lock:
+            self.completed += files
+            self.done_bytes += nbytes
+            self.stream.write(f"\r{self.render()}")
+            self.stream.flush()
+
+    def message(self, text):
+        """Imprime una línea sin romper la barra"""
+        with self._lock:
+            self.stream.write(f"\r{text}\n\r{self.render()}")
+            self.stream.flush()
+
+    def finish(self):
+        with self._lock:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+class CombinedProgress(ProgressDisplay):
+    """Una sola barra para varias transferencias simultáneas (p. ej. una por móvil).
+
+    Cada transferencia pide su parte con `part(etiqueta)`, que se usa igual que
+    el constructor de ProgressDisplay; la barra suma todas y muestra además el
+    porcentaje de cada etiqueta.
+    """
+
+    def __init__(self, width=30, stream=None):
+        super().__init__(0, 0, width, stream)
+        self._parts = {}
+
+    def part(self, label):
+        def factory(total_files, total_bytes=None):
+            with self._lock:
+                self.total_files += total_files
+                self.total_bytes += total_bytes or 0
+                self._parts[label] = [0, total_files]
+            return _ProgressPart(self, label)
+        return factory
+
+    def advance(self, label, files=1, nbytes=0):
+        with self._lock:
+            self._parts[label][0] += files
+        self.update(files, nbytes)
+
+    def render(self):
+        parts = " · ".join(
+            f"{label} {done / total:.0%}" if total else f"{label} ✓"
+            for label, (done, total) in self._parts.items()
+        )
+        return f"{super().render()} | {parts}"
+
+
+class _ProgressPart:
+    """La parte de una CombinedProgress que corresponde a una transferencia"""
+
+    def __init__(self, parent, label):
+        self.parent = parent
+        self.label = label
+
+    def update(self, files=1, nbytes=0):
+        self.parent.advance(self.label, files, nbytes)
+
+    def message(self, text):
+        self.parent.message(f"[{self.label}] {text}")
+
+    def finish(self):
+        # La línea la cierra quien creó la barra común, cuando acaban todas
+        pass
+
+
+def group_by_folder(jobs):
+    """Agrupa los trabajos (ruta_remota, ruta_local) por carpeta local de destino"""
+    groups = {}
+    for remote_path, local_path in jobs:
+        local_path = Path(local_path)
+        groups.setdefault(local_path.parent, []).append((remote_path, local_path))
+    return groups
+
+
+def _split(items, path_of, size_of):
+    batch, names, length, nbytes = [], set(), 0, 0
+    for item in items:
+        path = str(path_of(item))
+        name = os.path.basename(path.replace("\\", "/"))
+        cost = len(path) + 3
+        size = size_of(item)
+        if batch and (len(batch) >= MAX_BATCH_FILES
+                      or length + cost > MAX_BATCH_CMD_CHARS
+                      or nbytes + size > MAX_BATCH_BYTES
+                      or name in names):
+            yield batch
+            batch, names, length, nbytes = [], set(), 0, 0
+        batch.append(item)
+        names.add(name)
+        length += cost
+        nbytes += size
+    if batch:
+        yield batch
+
+
+def split_batches(jobs, sizes=None):
+    """Parte los trabajos en lotes que caben en una sola invocación de adb.
+
+    Dentro de un lote no puede repetirse el nombre remoto, porque todos se
+    descargan a la misma carpeta temporal.
+    """
+    return _split(jobs, lambda job: job[0], lambda job: estimated_size(job[0], sizes))
+
+
+def _run_pull(adb_path, remote_paths, staging, preserve_metadata, serial=None):
+    cmd = adb_command(adb_path, serial, "pull")
+    if preserve_metadata:
+        cmd.append("-a")
+    cmd += remote_paths
+    cmd.append(str(staging))
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except Exception as e:
+        return f"Error: {e}"
+    finally:
+        stats.adb_process(cmd, time.perf_counter() - start)
+    return f"{result.stdout}\n{result.stderr}".strip()
+
+
+def _error_lines(output):
+    return [line.strip() for line in output.splitlines() if "error" in line.lower()]
+
+
+def _error_for(remote_path, output):
+    for line in _error_lines(output):
+        if remote_path in line:
+            return line
+    return output or "Error: el archivo no se recibió"
+
+
+def remove_stale_staging(folder):
+    """Borra las carpetas temporales de lotes que una ejecución interrumpida dejó en folder"""
+    try:
+        with os.scandir(folder) as entries:
+            stale = [item.path for item in entries
+                     if item.name.startswith(STAGING_PREFIX) and item.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return 0
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+    return len(stale)
+
+
+def _pull_batch(adb_path, folder, batch, preserve_metadata, sizes, serial=None):
+    staging = folder / f"{STAGING_PREFIX}{uuid.uuid4().hex[:8]}"
+    staging.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    try:
+        pending = list(batch)
+        output = ""
+        for attempt in range(TRANSFER_RETRIES + 1):
+            output = _run_pull(adb_path, [remote for remote, _ in pending],
+                               staging, preserve_metadata, serial)
+            errors = _error_lines(output)
+            still_pending = []
+            for remote_path, local_path in pending:
+                staged = staging / remote_path.rsplit("/", 1)[-1]
+                expected = sizes.get(remote_path) if sizes else None
+                if (not staged.is_file()
+                        or any(remote_path in line for line in errors)
+                        or (expected is not None and staged.stat().st_size != expected)):
+                    still_pending.append((remote_path, local_path))
+            pending = still_pending
+            if not pending or attempt == TRANSFER_RETRIES or not is_transient_error(output):
+                break
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+        failed = {remote for remote, _ in pending}
+        results = []
+        for remote_path, local_path in batch:
+            if remote_path in failed:
+                results.append((remote_path, local_path, _error_for(remote_path, output), 0))
+                continue
+            staged = staging / remote_path.rsplit("/", 1)[-1]
+            nbytes = staged.stat().st_size
+            os.replace(staged, local_path)
+            results.append((remote_path, local_path, None, nbytes))
+        received = [nbytes for _, _, error, nbytes in results if error is None]
+        stats.transfer("pull", len(received), sum(received), time.perf_counter() - start)
+        return results
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+@timed()
+def pull_files(adb_path, jobs, preserve_metadata=False, on_result=None, sizes=None,
+               workers=TRANSFER_WORKERS, serial=None, transport=None):
+    """Descarga muchos archivos con pocas invocaciones de `adb pull`, varias a la vez.
+
+    `jobs` es una lista de (ruta_remota, ruta_local). Se agrupan por carpeta de
+    destino y cada lote se descarga con un único `adb pull` a una carpeta temporal
+    dentro de ese destino; después cada archivo se renombra a su ruta final. Los
+    lotes se reparten entre `workers` hilos, los más pesados primero (`sizes`,
+    si se conoce, es un dict ruta_remota → bytes).
+
+    Devuelve una lista de (ruta_remota, ruta_local, error), con error None si el
+    archivo llegó. `on_result(ruta_remota, ruta_local, error, bytes)` se llama
+    según se resuelve cada archivo, nunca desde dos hilos a la vez. Con `serial`
+    se descarga de ese móvil (adb -s) aunque haya varios conectados. Con
+    transport="tar" (o TRANSPORT) todo va en un solo flujo tar (`tar_pull_files`).
+    """
+    if (transport or TRANSPORT) == "tar":
+        return tar_pull_files(adb_path, jobs, preserve_metadata, on_result, sizes, serial)
+
+    tasks = []
+    for folder, folder_jobs in group_by_folder(jobs).items():
+        folder.mkdir(parents=True, exist_ok=True)
+        folder_jobs.sort(key=lambda job: estimated_size(job[0], sizes), reverse=True)
+        for batch in split_batches(folder_jobs, sizes):
+            weight = sum(estimated_size(remote, sizes) for remote, _ in batch)
+            tasks.append((weight, folder, batch))
+    tasks.sort(key=lambda task: task[0], reverse=True)
+
+    results = []
+    lock = threading.Lock()
+
+    def worker(task):
+        _, folder, batch = task
+        batch_results = _pull_batch(adb_path, folder, batch, preserve_metadata, sizes, serial)
+        with lock:
+            for remote_path, local_path, error, nbytes in batch_results:
+                results.append((remote_path, local_path, error))
+                if on_result:
+                    on_result(remote_path, local_path, error, nbytes)
+
+    run_parallel(tasks, worker, workers)
+    return results
+
+
+def _write_remote_list(adb_path, serial, names):
+    """Escribe en el móvil la lista de archivos para `tar -T` (por la sesión de shell, sin
+    el límite de longitud de la línea de comandos de Windows) y devuelve su ruta"""
+    session = get_session(adb_path, serial)
+    list_path = f"{TAR_LIST_DIR}/organizador-{uuid.uuid4().hex[:8]}.lst"
+    redirect = ">"
+    for i in range(0, len(names), TAR_LIST_CHUNK):
+        chunk = " ".join(shlex.quote(name) for name in names[i:i + TAR_LIST_CHUNK])
+        returncode, output = session.run(f"printf '%s\\n' {chunk} {redirect} {shlex.quote(list_path)}")
+        if returncode != 0:
+            raise OSError(f"Error: no se pudo escribir la lista de archivos en el móvil: {output}")
+        redirect = ">>"
+    return list_path
+
+
+def stream_tar(adb_path, remote_base, names, target_of, on_file, preserve_metadata=False, serial=None):
+    """Descarga names (relativos a remote_base) como un único flujo `adb exec-out tar`.
+
+    El tar se lee según llega (nunca entero en memoria ni en disco): cada archivo
+    se escribe en una carpeta temporal junto a su destino y se renombra a
+    target_of(nombre_en_el_tar); los que den None se descartan. Por cada archivo
+    colocado se llama a on_file(nombre, ruta_local, bytes).
+    """
+    list_path = _write_remote_list(adb_path, serial, names)
+    command = (f"cd {shlex.quote(remote_base)} && tar -cf - -T {shlex.quote(list_path)} 2>/dev/null; "
+               f"rm -f {shlex.quote(list_path)}")
+    cmd = adb_command(adb_path, serial, "exec-out", command)
+    stagings = {}
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                local_path = target_of(member.name)
+                if local_path is None:
+                    continue
+                local_path = Path(local_path)
+                folder = local_path.parent
+                if folder not in stagings:
+                    folder.mkdir(parents=True, exist_ok=True)
+                    stagings[folder] = folder / f"{STAGING_PREFIX}{uuid.uuid4().hex[:8]}"
+                    stagings[folder].mkdir()
+                staged = stagings[folder] / local_path.name
+                with archive.extractfile(member) as source, open(staged, "wb") as target:
+                    shutil.copyfileobj(source, target, TAR_COPY_CHUNK)
+                if preserve_metadata:
+                    os.utime(staged, (member.mtime, member.mtime))
+                os.replace(staged, local_path)
+                on_file(member.name, local_path, member.size)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        stats.adb_process(cmd, time.perf_counter() - start)
+        for staging in stagings.values():
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def tar_pull_files(adb_path, jobs, preserve_metadata=False, on_result=None, sizes=None, serial=None):
+    """Como `pull_files`, pero todo en un flujo tar desde la carpeta común de los archivos.
+
+    Lo que no llegue entero (tar sin soporte en el móvil, archivo borrado, tamaño
+    distinto del esperado, flujo cortado) se vuelve a pedir con `adb pull`.
+    """
+    jobs = [(remote_path, Path(local_path)) for remote_path, local_path in jobs]
+    if not jobs:
+        return []
+    remote_base = posixpath.commonpath([posixpath.dirname(remote) for remote, _ in jobs])
+    local_of = {posixpath.relpath(remote, remote_base): (remote, local) for remote, local in jobs}
+    results = []
+    done = set()
+    received = [0, 0]
+    start = time.perf_counter()
+
+    def target_of(name):
+        job = local_of.get(posixpath.normpath(name))
+        return job[1] if job else None
+
+    def on_file(name, local_path, nbytes):
+        remote_path, _ = local_of[posixpath.normpath(name)]
+        expected = sizes.get(remote_path) if sizes else None
+        if expected is not None and nbytes != expected:
+            return
+        done.add(remote_path)
+        received[0] += 1
+        received[1] += nbytes
+        results.append((remote_path, local_path, None))
+        if on_result:
+            on_result(remote_path, local_path, None, nbytes)
+
+    try:
+        stream_tar(adb_path, remote_base, list(local_of), target_of, on_file, preserve_metadata, serial)
+    except (OSError, tarfile.TarError):
+        # Sin tar en el móvil o flujo cortado: lo que falte va por el camino normal
+        pass
+    stats.transfer("tar", received[0], received[1], time.perf_counter() - start)
+
+    missing = [(remote, local) for remote, local in jobs if remote not in done]
+    if missing:
+        results += pull_files(adb_path, missing, preserve_metadata, on_result, sizes,
+                              serial=serial, transport="pull")
+    return results
+
+
+def tar_pull_tree(adb_path, remote_dir, local_dir, serial=None):
+    """Copia la carpeta remote_dir entera dentro de local_dir en un flujo tar (como `adb pull` de una carpeta).
+
+    Devuelve (archivos, bytes) copiados.
+    """
+    remote_base, name = posixpath.split(remote_dir.rstrip("/"))
+    local_dir = os.path.abspath(local_dir)
+    copied = [0, 0]
+
+    def target_of(member):
+        target = os.path.normpath(os.path.join(local_dir, member))
+        # Nada fuera de local_dir, aunque el tar traiga rutas con ".."
+        return target if target.startswith(local_dir + os.sep) else None
+
+    def on_file(member, local_path, nbytes):
+        copied[0] += 1
+        copied[1] += nbytes
+
+    start = time.perf_counter()
+    try:
+        stream_tar(adb_path, remote_base, [name], target_of, on_file, preserve_metadata=True, serial=serial)
+    finally:
+        stats.transfer("tar", copied[0], copied[1], time.perf_counter() - start)
+    return copied[0], copied[1]
+
+
+def push_tar_stream(adb_path, remote_dir, chunks, serial=None):
+    """Envía un tar ya hecho (bloques de bytes) y lo extrae en remote_dir con `adb exec-in tar -x`.
+
+    El tar no se guarda ni en el PC ni en el móvil: se extrae según llega, con
+    la fecha de cada archivo. Lanza OSError si adb o tar fallan; qué llegó
+    entero hay que comprobarlo después con un listado. Devuelve los bytes enviados.
+    """
+    quoted = shlex.quote(remote_dir)
+    cmd = adb_command(adb_path, serial, "exec-in", f"mkdir -p {quoted} && cd {quoted} && tar -xf -")
+    start = time.perf_counter()
+    sent = 0
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # stderr se va leyendo en otro hilo: si adb llena esa tubería mientras aún se le escribe, ambos se bloquearían
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    reader.start()
+    broken = False
+    try:
+        for chunk in chunks:
+            proc.stdin.write(chunk)
+            sent += len(chunk)
+        proc.stdin.close()
+    except BrokenPipeError:
+        # adb ya no lee (tar falló o el móvil se desconectó): su mensaje llega por stderr
+        broken = True
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.wait()
+        reader.join()
+        stats.adb_process(cmd, time.perf_counter() - start)
+    error = b"".join(stderr).decode(errors="replace").strip()
+    if broken:
+        raise OSError(error or "flujo cortado")
+    if proc.returncode != 0:
+        raise OSError(error or f"adb exec-in terminó con código {proc.returncode}")
+    return sent
+
+
+def _run_push(adb_path, local_paths, destination, serial=None):
+    cmd = adb_command(adb_path, serial, "push", "-a", *(str(path) for path in local_paths), destination)
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except Exception as e:
+        return f"Error: {e}"
+    finally:
+        stats.adb_process(cmd, time.perf_counter() - start)
+    output = f"{result.stdout}\n{result.stderr}".strip()
+    if result.returncode != 0 and "error" not in output.lower():
+        output = f"Error: {output}"
+    return output
+
+
+@timed()
+def push_files(adb_path, jobs, on_result=None, workers=TRANSFER_WORKERS, serial=None):
+    """Sube archivos (ruta_local, ruta_remota) con `adb push -a`, por lotes y varios lotes a la vez.
+
+    Los archivos que van a la misma carpeta remota con su mismo nombre se suben
+    juntos en un único `adb push origen... carpeta/`; esa carpeta tiene que
+    existir ya en el dispositivo. Los lotes más pesados salen primero y se
+    reintentan ante fallos transitorios. Devuelve una lista de
+    (ruta_local, ruta_remota, error) y llama a `on_result` como `pull_files`.
+    """
+    groups = {}
+    for local_path, remote_path in jobs:
+        local_path = Path(local_path)
+        remote_dir, remote_name = remote_path.rsplit("/", 1)
+        # Si el nombre cambia al subirlo, ese archivo va solo y con su ruta exacta
+        destination = remote_dir + "/" if remote_name == local_path.name else remote_path
+        groups.setdefault(destination, []).append((local_path, remote_path, local_path.stat().st_size))
+
+    tasks = []
+    for destination, group in groups.items():
+        group.sort(key=lambda job: job[2], reverse=True)
+        for batch in _split(group, lambda job: job[0], lambda job: job[2]):
+            tasks.append((sum(job[2] for job in batch), destination, batch))
+    tasks.sort(key=lambda task: task[0], reverse=True)
+
+    results = []
+    lock = threading.Lock()
+
+    def worker(task):
+        _, destination, batch = task
+        start = time.perf_counter()
+        output = with_retries(lambda: _run_push(adb_path, [job[0] for job in batch], destination, serial))
+        elapsed = time.perf_counter() - start
+        errors = _error_lines(output)
+        names_file = any(str(job[0]) in line or job[1] in line for job in batch for line in errors)
+        sent = []
+        with lock:
+            for local_path, remote_path, nbytes in batch:
+                error = next((line for line in errors
+                              if str(local_path) in line or remote_path in line), None)
+                # Un error que no nombra ningún archivo afecta a todo el lote
+                if error is None and errors and not names_file:
+                    error = output
+                results.append((local_path, remote_path, error))
+                if not error:
+                    sent.append(nbytes)
+                if on_result:
+                    on_result(local_path, remote_path, error, 0 if error else nbytes)
+        stats.transfer("push", len(sent), sum(sent), elapsed)
+
+    run_parallel(tasks, worker, workers)
+    return results
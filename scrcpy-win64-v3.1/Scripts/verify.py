@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+from adb_shell import get_session
+from transfer import run_parallel
+
+VERIFY_CACHE_FILE = ".verify_cache.sqlite3"
+# Archivos por cada `md5sum` en el móvil (una sola llamada por la sesión de shell)
+REMOTE_HASH_CHUNK = 100
+HASH_CHUNK_BYTES = 1024 * 1024
+HASH_WORKERS = 4
+MD5_LINE_REGEX = re.compile(r'^\\?([0-9a-f]{32})\s+\*?(/.+)$')
+
+
+def md5_file(path):
+    """MD5 de un archivo local, leído por bloques"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_md5sum(output):
+    """Dict ruta → md5 de la salida de `md5sum` (las rutas que fallaron no aparecen)"""
+    hashes = {}
+    for line in output.splitlines():
+        match = MD5_LINE_REGEX.match(line.strip())
+        if match:
+            hashes[match.group(2)] = match.group(1)
+    return hashes
+
+
+class VerifyCache:
+    """Caché persistente (SQLite) de sumas MD5 ya calculadas.
+
+    Las locales se guardan por ruta + tamaño + mtime y las del móvil por ruta
+    remota + tamaño + mtime: si nada ha cambiado, volver a verificar un backup
+    no lee ni un byte.
+    """
+
+    def __init__(self, path=VERIFY_CACHE_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        # Con varios móviles verificando a la vez, cada escritura se confirma enseguida (y con
+        # WAL no bloquea lecturas): una transacción abierta dejaría al otro móvil sin verificar
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in ("local", "remote"):
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS {table} (
+                       path TEXT PRIMARY KEY,
+                       size INTEGER NOT NULL,
+                       mtime INTEGER NOT NULL,
+                       md5 TEXT NOT NULL
+                   )"""
+            )
+        self._conn.commit()
+
+    def get(self, table, path, size, mtime):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT size, mtime, md5 FROM {table} WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[:2] == (size, mtime):
+            return row[2]
+        return None
+
+    def _write(self, sql, rows):
+        with self._lock:
+            self._conn.executemany(sql, rows)
+            self._conn.commit()
+
+    def put(self, table, path, size, mtime, md5):
+        self.put_many(table, [(path, size, mtime, md5)])
+
+    def put_many(self, table, rows):
+        """Guarda de una vez (una sola transacción) varias (ruta, tamaño, mtime, md5)"""
+        self._write(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)", rows)
+
+    def forget(self, table, path):
+        self._write(f"DELETE FROM {table} WHERE path = ?", [(path,)])
+
+    def local_md5(self, path):
+        """MD5 de la copia local, de la caché si el archivo no ha cambiado"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cached = self.get("local", path, st.st_size, st.st_mtime_ns)
+        if cached:
+            return cached
+        md5 = md5_file(path)
+        self.put("local", path, st.st_size, st.st_mtime_ns, md5)
+        return md5
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def remote_md5(adb_path, serial, paths, cache=None, stats=None):
+    """Dict ruta_remota → md5 calculado en el móvil, REMOTE_HASH_CHUNK archivos por llamada.
+
+    `stats` (dict ruta → (size, mtime) en el móvil) permite usar y rellenar la caché;
+    sin él siempre se calcula (p. ej. justo después de subir un archivo).
+    """
+    hashes = {}
+    pending = []
+    for path in paths:
+        known = stats.get(path) if stats else None
+        cached = cache.get("remote", path, *known) if cache and known else None
+        if cached:
+            hashes[path] = cached
+        else:
+            pending.append(path)
+
+    session = get_session(adb_path, serial)
+    for i in range(0, len(pending), REMOTE_HASH_CHUNK):
+        chunk = pending[i:i + REMOTE_HASH_CHUNK]
+        _, output = session.run(["md5sum", *chunk])
+        if i == 0 and "not found" in output and not parse_md5sum(output):
+            raise OSError("el móvil no tiene md5sum")
+        found = parse_md5sum(output)
+        rows = []
+        for path in chunk:
+            if path in found:
+                hashes[path] = found[path]
+                known = stats.get(path) if stats else None
+                if known:
+                    rows.append((path, *known, found[path]))
+        if cache and rows:
+            cache.put_many("remote", rows)
+    return hashes
+
+
+def verify_pairs(adb_path, pairs, serial=None, stats=None, cache_path=VERIFY_CACHE_FILE):
+    """Compara cada (ruta_remota, ruta_local) con el MD5 de ambos lados.
+
+    Las sumas del móvil se piden por lotes; las locales se calculan en paralelo.
+    Devuelve la lista de pares que no coinciden (también si falta alguno de los
+    dos archivos). Lanza OSError si el móvil no puede calcular sumas.
+    """
+    pairs = list(pairs)
+    with VerifyCache(cache_path) as cache:
+        remote = remote_md5(adb_path, serial, [remote_path for remote_path, _ in pairs], cache, stats)
+
+        def check(pair):
+            remote_path, local_path = pair
+            try:
+                local = cache.local_md5(local_path)
+            except OSError:
+                local = None
+            if local is None or local != remote.get(remote_path):
+                # Lo que no cuadra se vuelve a calcular la próxima vez
+                cache.forget("remote", remote_path)
+                return pair
+            return None
+
+        return [pair for pair in run_parallel(pairs, check, HASH_WORKERS) if pair]
@@ -1,12 +1,33 @@
 import subprocess
+import os
 import re
+from datetime import datetime
 from pathlib import Path
 import shutil
+import tarfile
+import time
+
+from adb_shell import get_session
+from catalog import MediaCatalog
+from dedup import DedupIndex, iter_files
+from device_cache import choose_serial, parse_devices
+from instrument import menu_report_path, save_menu_report, stats, timed
+from media_dates import MediaDateCache, metadata_date
+from name_alloc import NameAllocator, original_names
+from packs import PACK_SUFFIX, is_pack, packed_names
+from remote_index import iter_remote_files
+import transfer
+from transfer import (ProgressDisplay, adb_command, format_bytes, pull_files, run_parallel, tar_pull_tree,
+                      with_retries)
 
 BASE_DIR = Path(__file__).parent.parent  
-ADB_PATH = BASE_DIR / "adb.exe"
+# ADB_PATH en el entorno permite usar otro adb (el de Linux/macOS o bench/fake_adb.py)
+ADB_PATH = Path(os.environ.get("ADB_PATH") or BASE_DIR / "adb.exe")
 LOCAL_WA_DIR = "WhatsApp Media"
 MEDIA_EXTENSIONS = [".jpg", ".jpeg", ".png", ".mp4", ".mov", ".heic", ".avi", ".3gp"]
+MEDIA_EXTENSION_SET = {ext.lower() for ext in MEDIA_EXTENSIONS}
+YEAR_DIR_REGEX = re.compile(r'^\d{4}$')
+WA_DATE_REGEX = r'(?:IMG|VID)-(\d{4})(\d{2})(\d{2})-WA'
 
 MESES_ES = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -21,78 +42,305 @@ WA_PATHS = [
 
 
 def run_command(command):
+    """Ejecuta un comando (lista de argumentos) y devuelve su salida, o "Error: ..." si falla"""
+    start = time.perf_counter()
     try:
-        return subprocess.check_output(command, shell=True, text=True).strip()
+        return subprocess.check_output(command, text=True).strip()
     except subprocess.CalledProcessError as e:
         return f"Error: {e}"
+    finally:
+        stats.adb_process(command, time.perf_counter() - start)
 
 
-def check_device():
+@timed("whatsapp_check_device")
+def ready_devices():
+    """Serials de los móviles listos; vacío si no hay ninguno o alguno está pendiente de autorizar"""
     print("🔍 Buscando dispositivo...")
-    result = run_command(f"{ADB_PATH} devices")
+    result = run_command(adb_command(ADB_PATH, None, "devices"))
     print(result)
-    return "device" in result and "unauthorized" not in result
+    # La cabecera "List of devices attached" también dice "device": hay que mirar el estado de cada uno
+    devices = parse_devices(result)
+    if any(state == "unauthorized" for _, state in devices):
+        print("⚠️ Autoriza la conexión en tu móvil.")
+        return []
+    return [serial for serial, state in devices if state == "device"]
+
 
+def choose_device():
+    """Serial del móvil con el que trabajar: el único conectado o, si hay varios, el que se elija"""
+    return choose_serial(ready_devices())
 
-def copy_whatsapp_media():
-    if not check_device():
+
+@timed()
+def copy_whatsapp_media(serial=None):
+    """Copia tal cual las carpetas de WhatsApp del móvil serial (sin serial, se pregunta si hay varios)"""
+    serial = serial or choose_device()
+    if not serial:
         print("❌ Dispositivo no disponible.")
         return
 
     Path(LOCAL_WA_DIR).mkdir(parents=True, exist_ok=True)
 
-    for remote in WA_PATHS:
+    def pull_tree(remote):
         print(f"📥 Copiando desde {remote}...")
-        result = run_command(f'{ADB_PATH} pull "{remote}" "{LOCAL_WA_DIR}"')
+        if transfer.TRANSPORT == "tar":
+            # Miles de imágenes pequeñas en un solo flujo, sin ida y vuelta por archivo
+            try:
+                files, nbytes = tar_pull_tree(ADB_PATH, remote, LOCAL_WA_DIR, serial)
+                return remote, f"✅ {files} archivos copiados ({format_bytes(nbytes)}) en un flujo tar."
+            except (OSError, tarfile.TarError) as e:
+                print(f"⚠️ Sin flujo tar ({e}); se usa adb pull.")
+        result = with_retries(lambda: run_command(adb_command(ADB_PATH, serial, "pull", remote, LOCAL_WA_DIR)))
+        return remote, result
+
+    # Las carpetas de imágenes y vídeos se descargan a la vez
+    for remote, result in run_parallel(WA_PATHS, pull_tree):
         print(result)
 
+    # El árbol copiado tal cual se da de alta en el catálogo (solo se leen los archivos nuevos)
+    with MediaCatalog() as catalog:
+        added, _ = catalog.refresh([(LOCAL_WA_DIR, "whatsapp")], local_date, MEDIA_EXTENSIONS)
+    print(f"🗂️ {added} archivos nuevos en el catálogo.")
 
-def organize_whatsapp_media():
-    source = Path(LOCAL_WA_DIR)
-    if not source.exists():
-        print("❌ No existe la carpeta de WhatsApp.")
+
+def filename_date(filename):
+    """Fecha YYYYMMDD del nombre de WhatsApp (IMG-YYYYMMDD-WA...) o None"""
+    match = re.search(WA_DATE_REGEX, Path(filename).stem)
+    return "".join(match.groups()) if match else None
+
+
+def local_date(path):
+    """Fecha YYYYMMDD de un archivo ya copiado: la del nombre o la de sus metadatos, o None"""
+    return filename_date(Path(path).name) or metadata_date(path)
+
+
+def destination_folder(base, filename, date_str=None):
+    """Carpeta AÑO/MM-Mes que le toca a un archivo de WhatsApp según su nombre o date_str (o SinFecha)"""
+    date_str = filename_date(filename) or date_str
+    if not date_str:
+        return base / "SinFecha"
+    year, month = date_str[:4], int(date_str[4:6])
+    return base / year / f"{month:02d}-{MESES_ES[month]}"
+
+
+def organized_inventory(folder):
+    """Conjunto de (nombre original, tamaño) de lo que ya hay en una carpeta organizada (y en su paquete)"""
+    sizes = packed_names(folder)
+    try:
+        with os.scandir(folder) as entries:
+            for item in entries:
+                if item.is_file():
+                    sizes[item.name] = item.stat().st_size
+    except FileNotFoundError:
+        pass
+    return {(original, sizes[name]) for name, original in original_names(sizes).items()}
+
+
+def undated_inventory(base):
+    """Dict (nombre original, tamaño) → [rutas] de todo el backup de WhatsApp, esté en la carpeta que esté.
+
+    Lo que no lleva fecha en el nombre se descarga a SinFecha, pero al organizarlo
+    se mueve a AÑO/MM-Mes según sus metadatos. Sale del catálogo si lo conoce
+    entero; si no, se recorre la carpeta (con os.scandir, sin abrir nada).
+    """
+    with MediaCatalog() as catalog:
+        rows = catalog.query(source="whatsapp", folder=base) if catalog.covers(base) else None
+    if rows is not None:
+        files = [(path, size) for path, _, _, size, _ in rows]
+    else:
+        files = []
+        for path, st in iter_files(base):
+            if path.endswith(PACK_SUFFIX) and is_pack(path):
+                files.extend((os.path.join(path, name), size)
+                             for name, size in packed_names(path[:-len(PACK_SUFFIX)]).items())
+            else:
+                files.append((path, st.st_size))
+    folders = {}
+    for path, size in files:
+        folders.setdefault(os.path.dirname(path), {})[os.path.basename(path)] = size
+    inventory = {}
+    for folder, sizes in folders.items():
+        for name, original in original_names(sizes).items():
+            inventory.setdefault((original, sizes[name]), []).append(os.path.join(folder, name))
+    return inventory
+
+
+def already_organized(inventory, name, size):
+    """True si inventory tiene una copia de name con ese tamaño que sigue en disco (suelta o empaquetada)"""
+    for path in inventory.get((name, size), []):
+        folder, member = os.path.split(path)
+        if os.path.exists(path) or (folder.endswith(PACK_SUFFIX) and member in
+                                    packed_names(folder[:-len(PACK_SUFFIX)])):
+            return True
+    return False
+
+
+def sync_whatsapp_media():
+    """Descarga solo lo nuevo o cambiado de WhatsApp, directamente a su carpeta AÑO/MM-Mes"""
+    serial = choose_device()
+    if not serial:
+        print("❌ Dispositivo no disponible.")
         return
 
-    files = []
-    for ext in MEDIA_EXTENSIONS:
-        files.extend(source.rglob(f"*{ext}"))
+    since = input("📅 Sincronizar desde la fecha (YYYYMMDD, vacío = todo): ").strip()
+    if since:
+        try:
+            datetime.strptime(since, "%Y%m%d")
+        except ValueError:
+            print("❌ Fecha inválida. Asegúrate de usar el formato YYYYMMDD.")
+            return
 
-    total = 0
-    for file in files:
-        if file.name.startswith(".trashed-"):
+    sync_whatsapp(since, serial)
+
+
+@timed()
+def sync_whatsapp(since="", serial=None):
+    """Descarga del móvil serial lo nuevo desde since (YYYYMMDD, vacío = todo); True si no falló nada"""
+    base = Path(LOCAL_WA_DIR)
+    base.mkdir(parents=True, exist_ok=True)
+
+    # Un único listado remoto (nombre, tamaño y fecha) por carpeta de WhatsApp
+    session = get_session(ADB_PATH, serial)
+    entries = []
+    for remote in WA_PATHS:
+        print(f"📋 Listando {remote}...")
+        entries.extend(iter_remote_files(session, remote))
+
+    inventories = {}
+    undated = None
+    names = NameAllocator()
+    jobs = []
+    sizes = {}
+    skipped = 0
+    for entry in entries:
+        if entry.name.startswith(".trashed-"):
+            continue
+        if not any(entry.name.lower().endswith(ext) for ext in MEDIA_EXTENSIONS):
             continue
 
-        match = re.search(r'(?:IMG|VID)-(\d{4})(\d{2})(\d{2})-WA', file.stem)
-        if match:
-            year, month, _ = match.groups()
-            month = int(month)
-            dest = source / year / f"{month:02d}-{MESES_ES[month]}"
+        date_str = filename_date(entry.name)
+        if since and (not date_str or date_str < since):
+            continue
+
+        dest = destination_folder(base, entry.name)
+        if dest not in inventories:
+            inventories[dest] = organized_inventory(dest)
+        key = (entry.name, entry.size)
+        if key in inventories[dest]:
+            skipped += 1
+            continue
+        inventories[dest].add(key)
+        # Sin fecha en el nombre: puede que ya se organizara por sus metadatos fuera de SinFecha
+        if not date_str:
+            if undated is None:
+                undated = undated_inventory(base)
+            if already_organized(undated, entry.name, entry.size):
+                skipped += 1
+                continue
+
+        new_path = names.allocate(dest, entry.name)
+        jobs.append((entry.path, new_path))
+        sizes[entry.path] = entry.size
+
+    if skipped:
+        print(f"⏭️ {skipped} archivos ya estaban organizados, se omiten.")
+    if not jobs:
+        print("✅ WhatsApp ya está al día.")
+        return True
+
+    print(f"📥 {len(jobs)} archivos nuevos. Descargando...")
+    progress = ProgressDisplay(len(jobs), sum(sizes.values()))
+    total = 0
+
+    def on_result(remote_path, local_path, error, nbytes):
+        nonlocal total
+        if error:
+            progress.message(f"⚠️ Error copiando {local_path.name}: {error}")
         else:
-            dest = source / "SinFecha"
+            total += 1
+            new_files.append(local_path)
+            catalog.add(local_path, "whatsapp", local_date(local_path))
+        progress.update(nbytes=nbytes)
+
+    new_files = []
+    with MediaCatalog() as catalog:
+        pull_files(ADB_PATH, jobs, on_result=on_result, sizes=sizes, serial=serial)
+    progress.finish()
+    print(f"✅ {total} archivos de WhatsApp sincronizados.")
+
+    # Lo que ya estaba en otro backup (p. ej. la misma foto en la cámara) pasa a ser un enlace duro
+    with DedupIndex() as index:
+        linked, saved = index.link_duplicates(new_files)
+    if linked:
+        print(f"🔗 {linked} archivos ya estaban en otro backup; enlazados ({format_bytes(saved)} ahorrados).")
+    return total == len(jobs)
+
 
-        dest.mkdir(parents=True, exist_ok=True)
-        new_path = dest / file.name
+def iter_unorganized_media(source):
+    """Recorre source una sola vez (os.scandir) y va devolviendo los archivos de media por organizar.
 
-        if new_path.exists():
-            base, ext = file.stem, file.suffix
-            i = 1
-            while new_path.exists():
-                new_path = dest / f"{base}_{i}{ext}"
-                i += 1
+    Las carpetas AÑO/ no se recorren, así que lo ya organizado no se vuelve a
+    mover. SinFecha/ sí, por si ahora se puede sacar la fecha de los metadatos.
+    """
+    source = str(source)
+    pending = [source]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for item in entries:
+                    if item.is_dir(follow_symlinks=False):
+                        if current == source and YEAR_DIR_REGEX.match(item.name):
+                            continue
+                        pending.append(item.path)
+                    elif (item.is_file()
+                          and not item.name.startswith(".trashed-")
+                          and os.path.splitext(item.name)[1].lower() in MEDIA_EXTENSION_SET):
+                        yield Path(item.path)
+        except OSError as e:
+            print(f"⚠️ No se pudo leer {current}: {e}")
+
+
+@timed()
+def organize_whatsapp_media():
+    source = Path(LOCAL_WA_DIR)
+    if not source.exists():
+        print("❌ No existe la carpeta de WhatsApp.")
+        return
+
+    total = 0
+    created = set()
+    names = NameAllocator()
+    with MediaDateCache() as dates, MediaCatalog() as catalog:
+        for file in iter_unorganized_media(source):
+            # Sin fecha en el nombre: EXIF / cabecera del vídeo (solo se lee una vez por archivo)
+            date_str = filename_date(file.name) or dates.date_of(file)
+            dest = destination_folder(source, file.name, date_str)
+            if dest == file.parent:
+                continue
+            if dest not in created:
+                dest.mkdir(parents=True, exist_ok=True)
+                created.add(dest)
+            new_path = names.allocate(dest, file.name)
 
-        shutil.move(str(file), new_path)
-        total += 1
+            shutil.move(str(file), new_path)
+            total += 1
+            if not catalog.move(file, new_path, date_str):
+                catalog.add(new_path, "whatsapp", date_str)
 
     print(f"✅ {total} archivos de WhatsApp organizados.")
 
 
 def menu():
+    report = menu_report_path()
+    stats.reset()
     while True:
         print("\n--- WHATSAPP MEDIA ---")
         print("1. Copiar fotos y vídeos de WhatsApp")
         print("2. Organizar WhatsApp por AÑO y MES")
         print("3. Copiar + organizar (todo)")
-        print("4. Salir")
+        print("4. Sincronizar solo lo nuevo (directo a AÑO/MES)")
+        print("5. Salir")
 
         choice = input("Selecciona una opción: ")
 
@@ -104,9 +352,13 @@ def menu():
             copy_whatsapp_media()
             organize_whatsapp_media()
         elif choice == "4":
+            sync_whatsapp_media()
+        elif choice == "5":
+            save_menu_report(report, final=True)
             break
         else:
             print("❌ Opción inválida.")
+        save_menu_report(report)
 
 
 if __name__ == "__main__":